@@ -44,8 +44,12 @@ AVAILABLE CUSTOM_PROPERTIES:
         - property: position; to: 1 8 -10; dur: 2000; easing: linear; loop: true;
     - AFRAME_HTTP_LINK: html link when click on object       
     - AFRAME_VIDEO: target=mp4 video to show
+    - AFRAME_VIDEO_AUTOPLAY: false to not play the video at startup (non autoplay videos are loaded on demand with "Lazy Videos")
+    - AFRAME_VIDEO_STREAM: true to always load the video on demand (click or proximity) instead of in a-assets
     - AFRAME_IMAGES: click to swap images e.g: {"1": "image1.jpg", "2": "image2.jpg"}
     - AFRAME_SHOW_HIDE_OBJECT: click to show or hide another 3d object
+    - AFRAME_COMPRESSION: mesh compression profile for this object (NONE, DRACO_FAST, DRACO, DRACO_MAX, QUANTIZE)
+    - AFRAME_LOD: LOD decimate ratios for this object, e.g: 0.5, 0.2 (0 disables the LODs)
 
 THIRD PARTY SOFTWARE:
     This Addon Uses the following 3rdParty software (or their integration/modification):
@@ -68,18 +72,40 @@ bl_info = {
 
 import os
 import bpy
+import bmesh
 import shutil
 import math
 from string import Template
 import http.server
-import urllib.request
-import socketserver
+import functools
+import time
+import collections
+import email.utils
+import io
 import threading
 import json
 import random
 import string
+import hashlib
+import array
+import subprocess
+import concurrent.futures
+import tempfile
+import sys
+import struct
+import urllib.parse
+import base64
+import gzip
+import html
+from mathutils import Matrix, Quaternion, Vector
+try:
+    import numpy
+except ImportError:
+    numpy = None # the fast glTF writer falls back to the glTF exporter
 
 PORT = 8001
+PREVIEW_CACHE_SIZE = 256 * 1024 * 1024
+RELOAD_PATH = "/__reload"
 
 # Constants
 PATH_INDEX = "index.html"
@@ -89,6 +115,13 @@ PATH_MEDIA = "media/"
 PATH_ENVIRONMENT = "env/"
 PATH_LIGHTMAPS = "lightmaps/"
 PATH_JAVASCRIPT = "js/"
+PATH_MANIFEST = "manifest.json"
+SHARED_MESH_PREFIX = "mesh_"
+PATH_TEXTURES = "textures/"
+PATH_REPORT = "aframe_export_report.txt"
+PATH_TEXTURE_CACHE = "texture_cache.json"
+IMAGE_EXTENSIONS = { "image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp" }
+MANIFEST_VERSION = 1
 AFRAME_ENABLED = "AFRAME_ENABLED"
 AFRAME_HTTP_LINK = "AFRAME_HTTP_LINK"
 AFRAME_ANIMATION = "AFRAME_ANIMATION"
@@ -97,6 +130,8 @@ AFRAME_IMAGES = "AFRAME_IMAGES"
 AFRAME_DOWNLOAD = "AFRAME_DOWNLOAD"
 AFRAME_VIDEO_AUTOPLAY = "AFRAME_VIDEO_AUTOPLAY"
 AFRAME_VIDEO_STREAM = "AFRAME_VIDEO_STREAM"
+AFRAME_COMPRESSION = "AFRAME_COMPRESSION"
+AFRAME_LOD = "AFRAME_LOD"
 
 assets = []
 entities = []
@@ -105,41 +140,1935 @@ blender_lights = []
 final_lights = ""
 showstats = ""
 
-# Need to subclass SimpleHTTPRequestHandler so we can serve cache-busting headers
+class FileCache:
+    # size bounded LRU cache of file contents, an entry is valid while the file mtime and size are unchanged
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path, stat):
+        with self.lock:
+            entry = self.items.get(path)
+            if entry is None or entry[0] != (stat.st_mtime_ns, stat.st_size):
+                return None
+            self.items.move_to_end(path)
+            return entry[1]
+
+    def put(self, path, stat, content):
+        if len(content) > self.max_bytes // 8:
+            return # big files (videos) are streamed from disk
+        with self.lock:
+            old = self.items.pop(path, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.items[path] = ( (stat.st_mtime_ns, stat.st_size), content )
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+class ReloadChannel:
+    # export counter watched by the pages connected to RELOAD_PATH (Server-Sent Events)
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+        self.stopped = False
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version or self.stopped, timeout)
+            return self.version
+
+# Need to subclass SimpleHTTPRequestHandler so we can serve revalidation headers
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # keep-alive: a page loads all its assets on a few connections
+    protocol_version = "HTTP/1.1"
+    cache = FileCache(PREVIEW_CACHE_SIZE)
+
     def end_headers(self):
         self.send_my_headers()
         http.server.SimpleHTTPRequestHandler.end_headers(self)
 
     def send_my_headers(self):
-        self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
-        self.send_header("Pragma", "no-cache")
-        self.send_header("Expires", "0")
+        # the browser keeps the files but asks every time if they changed (ETag / Last-Modified)
+        self.send_header("Cache-Control", "no-cache")
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] == RELOAD_PATH:
+            self.send_reload_events()
+            return
+        http.server.SimpleHTTPRequestHandler.do_GET(self)
+
+    def send_reload_events(self):
+        # event stream: "reload" after every export, a comment every 15 seconds to keep the connection open
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        reloads = self.server.reloads
+        version = reloads.version
+        try:
+            while not reloads.stopped:
+                current = reloads.wait(version, 15)
+                if current != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = current
+                elif not reloads.stopped:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except OSError:
+            pass # page closed
+
+    def byte_range(self, size):
+        # (start, length) of a single "bytes=" Range, None to send the whole file, False when not satisfiable
+        value = self.headers.get("Range", "").strip()
+        if not value.startswith("bytes=") or "," in value:
+            return None
+        first, sep, last = value[6:].strip().partition("-")
+        try:
+            if first == "":
+                length = min(int(last), size) # suffix: last bytes of the file
+                start = size - length
+            else:
+                start = int(first)
+                length = min(int(last) + 1 if last else size, size) - start
+        except ValueError:
+            return None
+        if not sep or start >= size or length <= 0:
+            return False
+        return start, length
+
+    def copyfile(self, source, outputfile):
+        # files and ranges not kept in memory go with socket.sendfile (zero copy os.sendfile when available)
+        if isinstance(source, FileRange):
+            self.connection.sendfile(source.file, source.start, source.length)
+        elif isinstance(source, io.BufferedReader):
+            self.connection.sendfile(source)
+        else:
+            http.server.SimpleHTTPRequestHandler.copyfile(self, source, outputfile)
+
+    def not_modified(self, etag, stat):
+        # If-None-Match wins over If-Modified-Since
+        if "If-None-Match" in self.headers:
+            tags = [ tag.strip() for tag in self.headers["If-None-Match"].split(",") ]
+            return etag in tags or "*" in tags
+        if "If-Modified-Since" in self.headers:
+            try:
+                since = email.utils.parsedate_to_datetime(self.headers["If-Modified-Since"])
+            except (TypeError, ValueError, IndexError):
+                return False
+            return since is not None and int(stat.st_mtime) <= since.timestamp()
+        return False
+
+    def send_head(self):
+        # regular files with ETag, Last-Modified, 304 answers and the memory cache; directories and errors as before
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path) or self.path.split("?", 1)[0].endswith("/"):
+            return http.server.SimpleHTTPRequestHandler.send_head(self)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        content_type = self.guess_type(path)
+        encoding = None
+        # range requests (video seeking) always get the file itself
+        if "gzip" in self.headers.get("Accept-Encoding", "") and "Range" not in self.headers:
+            # precompressed sibling written by the export, used while it is newer than the file
+            try:
+                gz_stat = os.stat(path + ".gz")
+                if gz_stat.st_mtime_ns >= stat.st_mtime_ns:
+                    path, stat, encoding = path + ".gz", gz_stat, "gzip"
+            except OSError:
+                pass
+        etag = '"' + format(stat.st_mtime_ns, "x") + "-" + format(stat.st_size, "x") + '"'
+        if self.not_modified(etag, stat):
+            self.send_response(304)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+            self.end_headers()
+            return None
+        content = self.cache.get(path, stat)
+        if content is None:
+            try:
+                file = open(path, "rb")
+            except OSError:
+                self.send_error(404, "File not found")
+                return None
+            if stat.st_size > self.cache.max_bytes // 8:
+                body = file
+            else:
+                with file:
+                    content = file.read()
+                self.cache.put(path, stat, content)
+        size = stat.st_size if content is None else len(content)
+        part = None
+        if encoding is None and self.headers.get("If-Range", etag) == etag:
+            part = self.byte_range(size)
+        if part is False:
+            if content is None:
+                body.close()
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */"+str(size))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if part:
+            start, length = part
+            body = io.BytesIO(content[start:start + length]) if content is not None else FileRange(body, start, length)
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes "+str(start)+"-"+str(start + length - 1)+"/"+str(size))
+            size = length
+        else:
+            if content is not None:
+                body = io.BytesIO(content)
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        else:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(size))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return body
+
+class FileRange:
+    # part of an open file sent by MyHTTPRequestHandler.copyfile
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+
+    def close(self):
+        self.file.close()
+
+class PreviewHTTPServer(http.server.ThreadingHTTPServer):
+    # one thread per connection, several headsets can load the preview at the same time
+    allow_reuse_address = True
+    daemon_threads = True
 
 class Server(threading.Thread):
     instance = None
     folder = ""
-    should_stop = False
+    address = ""
+    port = PORT
+    httpd = None
         
     def set_folder(self, folder):
         self.folder = folder
+
+    def bind(self, address, port):
+        # bind in the calling thread, so address errors reach the operator
+        self.address = address
+        self.port = port
+        handler = functools.partial(MyHTTPRequestHandler, directory=self.folder)
+        self.httpd = PreviewHTTPServer((address, port), handler)
+        self.httpd.reloads = ReloadChannel()
+
+    def notify_reload(self):
+        self.httpd.reloads.notify()
+
+    def url(self):
+        host = self.address if self.address not in ("", "0.0.0.0") else "localhost"
+        return f'http://{host}:{self.port}'
         
     def run(self):
-        Handler = MyHTTPRequestHandler
-        socketserver.TCPServer.allow_reuse_address = True
-        with socketserver.TCPServer(("", PORT), Handler) as httpd:
-            os.chdir(self.folder)
-            while True:
-                if self.should_stop:
-                    httpd.server_close()
-                    break
-                httpd.handle_request()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
 
     def stop(self):
-        self.should_stop = True
-        # Consume the last handle_request call that's still pending
-        with urllib.request.urlopen(f'http://localhost:{PORT}/') as response:
-            html = response.read()
+        self.httpd.reloads.close()
+        self.httpd.shutdown()
+        self.join()
+
+
+# ------------------------------------------- GLTF EXPORT
+# mesh compression profiles: Draco level and quantization bits (position, normal, texcoord, generic)
+COMPRESSION_PROFILES = {
+    'NONE': None,
+    'DRACO_FAST': ( 1, 14, 10, 12, 12 ),
+    'DRACO': ( 6, 14, 10, 12, 12 ),
+    'DRACO_MAX': ( 10, 12, 8, 10, 10 ),
+    'QUANTIZE': ( 0, 11, 8, 10, 8 ),
+}
+
+def compression_profile(scene, obj=None):
+    # AFRAME_COMPRESSION custom property (profile name) overrides the project profile
+    if obj is not None and AFRAME_COMPRESSION in obj.keys():
+        profile = str(obj[AFRAME_COMPRESSION]).upper()
+        if profile in COMPRESSION_PROFILES:
+            return profile
+        print("[COMPRESSION] unknown profile "+profile+" for object "+obj.name)
+    return scene.s_compression
+
+def gltf_export_options(scene, obj=None):
+    # settings shared by every glTF export call (also part of the incremental hash)
+    profile = COMPRESSION_PROFILES[compression_profile(scene, obj)]
+    draco = profile or COMPRESSION_PROFILES['DRACO']
+    options = {
+        "export_format": scene.s_export_format,
+        "export_texcoords": True,
+        "export_normals": True,
+        "export_draco_mesh_compression_enable": profile is not None,
+        "export_draco_mesh_compression_level": draco[0],
+        "export_draco_position_quantization": draco[1],
+        "export_draco_normal_quantization": draco[2],
+        "export_draco_texcoord_quantization": draco[3],
+        "export_draco_generic_quantization": draco[4],
+        "export_tangents": True,
+        "export_materials": 'EXPORT',
+        "export_colors": True,
+        "export_extras": True,
+        "export_yup": True,
+        "export_apply": True,
+        "export_animations": True,
+        "export_frame_range": True,
+        "export_frame_step": 1,
+        "export_force_sampling": True,
+    }
+    if scene.s_export_format == 'GLTF_SEPARATE':
+        # textures of every asset go to one shared folder
+        options["export_texture_dir"] = PATH_TEXTURES.rstrip("/")
+    return options
+
+def export_gltf(filepath, scene, obj=None):
+    # export the selected objects to filepath, obj selects the per object settings
+    bpy.ops.export_scene.gltf(filepath=filepath, use_selection=True, **gltf_export_options(scene, obj))
+
+def bounds_center(obj):
+    # world position of the bounding box centre, origin of the exported model
+    return obj.matrix_world @ (sum((Vector(corner) for corner in obj.bound_box), Vector()) / 8)
+
+def set_export_transform(obj, clear):
+    # transform of obj while its model is exported, returns the values given back to restore_transform:
+    # 'TRANSFORM' exports the mesh alone, 'CENTER' keeps rotation and scale and moves the bounds centre to the origin
+    saved = ( obj.location.copy(), obj.rotation_euler.copy(), obj.rotation_quaternion.copy(), tuple(obj.rotation_axis_angle), obj.scale.copy() )
+    if clear == 'TRANSFORM':
+        obj.matrix_basis = Matrix.Identity(4)
+    else:
+        # only the location moves, in the space of the parent
+        offset = -bounds_center(obj)
+        if obj.parent:
+            offset = (obj.parent.matrix_world @ obj.matrix_parent_inverse).to_3x3().inverted_safe() @ offset
+        obj.location += offset
+    return saved
+
+def restore_transform(obj, saved):
+    # the stored values themselves: a matrix would be decomposed again and change the rotation values
+    obj.location, obj.rotation_euler, obj.rotation_quaternion, obj.rotation_axis_angle, obj.scale = saved
+    # the glTF export evaluated the children with the moved transform: their matrix_world must be evaluated again
+    # before the next bounds_center, set_export_transform or object_hash (only the changed objects are updated)
+    bpy.context.view_layer.update()
+
+def deselect_objects(view_layer):
+    # selected objects, deselected one by one (no operator, no scene walk): the export selects one object at a time
+    selection = [ obj for obj in view_layer.objects if obj.select_get() ]
+    for obj in selection:
+        obj.select_set(state=False)
+    return selection
+
+def asset_extension(scene):
+    return ".glb" if scene.s_export_format == 'GLB' else ".gltf"
+
+def read_gltf_json(path):
+    # JSON part of a .gltf or .glb file
+    with open(path, "rb") as file:
+        header = file.read(12)
+        if header[:4] == b"glTF":
+            length, chunk_type = struct.unpack("<II", file.read(8))
+            return json.loads(file.read(length))
+        return json.loads(header + file.read())
+
+def gltf_dependencies(path):
+    # external files (buffers, textures) referenced by a glTF asset, relative to its directory
+    data = read_gltf_json(path)
+    files = []
+    for item in data.get("buffers", []) + data.get("images", []):
+        uri = item.get("uri", "")
+        if uri and not uri.startswith("data:"):
+            files.append(os.path.normpath(urllib.parse.unquote(uri)).replace(os.sep, "/"))
+    return files
+
+def asset_files(scene, directory, filename):
+    # every file written by the export of one asset (the asset itself first)
+    if scene.s_export_format != 'GLTF_SEPARATE' and not scene.b_texture_store:
+        return [ filename ]
+    return [ filename ] + gltf_dependencies(os.path.join(directory, filename))
+
+def load_gltf(path):
+    # glTF JSON and the content of its first buffer when stored inside the file (GLB chunk or base64 uri)
+    with open(path, "rb") as file:
+        content = file.read()
+    if content[:4] == b"glTF":
+        length = struct.unpack_from("<I", content, 12)[0]
+        data = json.loads(content[20:20+length])
+        binary = None
+        if len(content) > 20+length:
+            bin_length = struct.unpack_from("<I", content, 20+length)[0]
+            binary = content[28+length:28+length+bin_length]
+        return data, binary
+    data = json.loads(content)
+    buffers = data.get("buffers", [])
+    if buffers and buffers[0].get("uri", "").startswith("data:"):
+        return data, base64.b64decode(buffers[0]["uri"].split(",", 1)[1])
+    return data, None
+
+def save_gltf(path, data, binary):
+    # write back a glTF loaded with load_gltf, in the same container
+    if path.endswith(".glb"):
+        text = json.dumps(data, separators=(',', ':')).encode()
+        text += b" " * (-len(text) % 4)
+        chunks = struct.pack("<II", len(text), 0x4E4F534A) + text
+        if binary:
+            binary += b"\0" * (-len(binary) % 4)
+            chunks += struct.pack("<II", len(binary), 0x004E4942) + binary
+        content = struct.pack("<III", 0x46546C67, 2, 12 + len(chunks)) + chunks
+    else:
+        if binary is not None:
+            data["buffers"][0]["uri"] = "data:application/octet-stream;base64," + base64.b64encode(binary).decode()
+        content = json.dumps(data, separators=(',', ':')).encode()
+    with open(path, "wb") as file:
+        file.write(content)
+
+# byte size of the glTF accessor component types and element types
+_COMPONENT_SIZES = { 5120: 1, 5121: 1, 5122: 2, 5123: 2, 5125: 4, 5126: 4 }
+_TYPE_SIZES = { "SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16 }
+
+def geometry_sizes(path):
+    # mesh data bytes of an asset: (uncompressed accessors, stored bytes with Draco compression)
+    data = read_gltf_json(path)
+    accessors = data.get("accessors", [])
+    views = data.get("bufferViews", [])
+    def accessor_size(index):
+        accessor = accessors[index]
+        return accessor["count"] * _TYPE_SIZES[accessor["type"]] * _COMPONENT_SIZES[accessor["componentType"]]
+    raw = 0
+    stored = 0
+    for mesh in data.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            size = sum(accessor_size(i) for i in primitive.get("attributes", {}).values())
+            if "indices" in primitive:
+                size += accessor_size(primitive["indices"])
+            raw += size
+            draco = primitive.get("extensions", {}).get("KHR_draco_mesh_compression")
+            stored += views[draco["bufferView"]]["byteLength"] if draco else size
+    return raw, stored
+
+def _remap_buffer_views(item, remap):
+    # update every "bufferView" reference (accessors, images, extensions like Draco)
+    if isinstance(item, dict):
+        for key, value in item.items():
+            if key == "bufferView" and isinstance(value, int):
+                item[key] = remap[value]
+            else:
+                _remap_buffer_views(value, remap)
+    elif isinstance(item, list):
+        for value in item:
+            _remap_buffer_views(value, remap)
+
+def compact_buffer(data, binary, removed):
+    # drop the removed buffer views from the first buffer, returns the new buffer content
+    views = data.get("bufferViews", [])
+    kept = []
+    remap = {}
+    new_binary = bytearray()
+    for index, view in enumerate(views):
+        if index in removed:
+            continue
+        if view.get("buffer", 0) == 0:
+            new_binary += b"\0" * (-len(new_binary) % 4)
+            start = view.get("byteOffset", 0)
+            chunk = binary[start:start+view["byteLength"]]
+            view["byteOffset"] = len(new_binary)
+            new_binary += chunk
+        remap[index] = len(kept)
+        kept.append(view)
+    data["bufferViews"] = kept
+    for key in data:
+        if key != "bufferViews":
+            _remap_buffer_views(data[key], remap)
+    data["buffers"][0]["byteLength"] = len(new_binary)
+    if not kept:
+        del data["bufferViews"]
+    return bytes(new_binary)
+
+
+# ------------------------------------------- FAST GLTF WRITER
+# z-up (blender) to y-up (glTF) basis change, applied to the node matrix and to the vertex data
+_YUP = Matrix(( (1, 0, 0, 0), (0, 0, 1, 0), (0, -1, 0, 0), (0, 0, 0, 1) ))
+_MATERIAL_NODES = { 'BSDF_PRINCIPLED', 'OUTPUT_MATERIAL' }
+
+def fast_material(material):
+    # glTF material of a material without textures (one unlinked Principled BSDF or no nodes), None when the glTF exporter is needed
+    if material.use_nodes:
+        nodes = material.node_tree.nodes
+        principled = [ node for node in nodes if node.type == 'BSDF_PRINCIPLED' ]
+        if len(principled) != 1 or any(node.type not in _MATERIAL_NODES for node in nodes):
+            return None
+        bsdf = principled[0]
+        if any(socket.is_linked for socket in bsdf.inputs):
+            return None
+        color = list(bsdf.inputs["Base Color"].default_value)[:3] + [ bsdf.inputs["Alpha"].default_value ]
+        metallic = bsdf.inputs["Metallic"].default_value
+        roughness = bsdf.inputs["Roughness"].default_value
+        emission = bsdf.inputs.get("Emission Color") or bsdf.inputs.get("Emission")
+        strength = bsdf.inputs.get("Emission Strength")
+        emissive = [ c * (strength.default_value if strength else 1.0) for c in list(emission.default_value)[:3] ] if emission else [ 0, 0, 0 ]
+    else:
+        color = list(material.diffuse_color)
+        metallic = material.metallic
+        roughness = material.roughness
+        emissive = [ 0, 0, 0 ]
+    data = { "name": material.name, "pbrMetallicRoughness": { "baseColorFactor": color, "metallicFactor": metallic, "roughnessFactor": roughness } }
+    if max(emissive) > 0:
+        data["emissiveFactor"] = [ min(c, 1.0) for c in emissive ]
+    if material.blend_method in ('BLEND', 'HASHED'):
+        data["alphaMode"] = "BLEND"
+    elif material.blend_method == 'CLIP':
+        data["alphaMode"] = "MASK"
+        data["alphaCutoff"] = material.alpha_threshold
+    if not material.use_backface_culling:
+        data["doubleSided"] = True
+    return data
+
+def fast_writer_reason(scene, obj):
+    # why obj needs the glTF exporter, None when the fast writer can write it
+    if numpy is None:
+        return "numpy not available"
+    if obj.type != 'MESH':
+        return obj.type.lower()
+    if compression_profile(scene, obj) != 'NONE':
+        return "compression"
+    if not obj.data.polygons:
+        return "no faces"
+    if obj.data.shape_keys:
+        return "shape keys"
+    if obj.find_armature() or any(mod.type in ('ARMATURE', 'NODES', 'PARTICLE_SYSTEM') for mod in obj.modifiers):
+        return "armature or generated geometry"
+    if obj.animation_data and obj.animation_data.action:
+        return "animation"
+    if len(obj.data.color_attributes):
+        return "vertex colors"
+    for slot in obj.material_slots:
+        if slot.material and fast_material(slot.material) is None:
+            return "material "+slot.material.name
+    return None
+
+def _extras_value(value):
+    # custom property as a JSON value (export_extras of the glTF exporter), None when not convertible
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if hasattr(value, "to_list"):
+        return value.to_list()
+    return None
+
+def fast_gltf_data(obj, matrix, mesh):
+    # glTF JSON and binary buffer of an evaluated mesh: loop attributes read with foreach_get,
+    # vertices deduplicated on (position, normal, uvs), one primitive per material
+    mesh.calc_loop_triangles()
+    if hasattr(mesh, "calc_normals_split"):
+        mesh.calc_normals_split() # loop normals are computed on demand before Blender 4.1
+    loop_count = len(mesh.loops)
+    triangle_count = len(mesh.loop_triangles)
+    positions = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", positions)
+    vertex_index = numpy.empty(loop_count, dtype=numpy.int32)
+    mesh.loops.foreach_get("vertex_index", vertex_index)
+    normals = numpy.empty(loop_count * 3, dtype=numpy.float32)
+    mesh.loops.foreach_get("normal", normals)
+    columns = [ positions.reshape(-1, 3)[vertex_index], normals.reshape(-1, 3) ]
+    for column in columns:
+        column[:, [1, 2]] = column[:, [2, 1]] * numpy.array([ 1, -1 ], dtype=numpy.float32) # y-up
+    for layer in mesh.uv_layers:
+        uvs = numpy.empty(loop_count * 2, dtype=numpy.float32)
+        layer.data.foreach_get("uv", uvs)
+        uvs = uvs.reshape(-1, 2)
+        uvs[:, 1] = 1.0 - uvs[:, 1]
+        columns.append(uvs)
+    vertices, inverse = numpy.unique(numpy.hstack(columns), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    triangle_loops = numpy.empty(triangle_count * 3, dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get("loops", triangle_loops)
+    triangle_materials = numpy.empty(triangle_count, dtype=numpy.int32)
+    mesh.loop_triangles.foreach_get("material_index", triangle_materials)
+    triangles = inverse[triangle_loops].reshape(-1, 3)
+    index_type, component = (numpy.uint16, 5123) if len(vertices) < 65536 else (numpy.uint32, 5125)
+
+    data = { "asset": { "version": "2.0", "generator": "A-Frame exporter fast writer" }, "scene": 0, "scenes": [ { "nodes": [ 0 ] } ],
+             "buffers": [], "bufferViews": [], "accessors": [] }
+    chunks = []
+    def add_view(array, target):
+        offset = sum(len(chunk) for chunk in chunks)
+        content = array.tobytes()
+        chunks.append(content + b"\0" * (-len(content) % 4))
+        data["bufferViews"].append({ "buffer": 0, "byteOffset": offset, "byteLength": len(content), "target": target })
+        return len(data["bufferViews"]) - 1
+    def add_accessor(array, component_type, kind, bounds=False):
+        accessor = { "bufferView": add_view(array, 34963 if kind == "SCALAR" else 34962), "componentType": component_type, "count": len(array), "type": kind }
+        if bounds:
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        data["accessors"].append(accessor)
+        return len(data["accessors"]) - 1
+
+    attributes = {
+        "POSITION": add_accessor(numpy.ascontiguousarray(vertices[:, 0:3]), 5126, "VEC3", True),
+        "NORMAL": add_accessor(numpy.ascontiguousarray(vertices[:, 3:6]), 5126, "VEC3"),
+    }
+    for i in range(len(mesh.uv_layers)):
+        attributes["TEXCOORD_"+str(i)] = add_accessor(numpy.ascontiguousarray(vertices[:, 6+2*i:8+2*i]), 5126, "VEC2")
+    primitives = []
+    materials = []
+    slots = obj.material_slots
+    for material_index in numpy.unique(triangle_materials).tolist():
+        indices = triangles[triangle_materials == material_index].reshape(-1).astype(index_type)
+        primitive = { "attributes": attributes, "indices": add_accessor(indices, component, "SCALAR"), "mode": 4 }
+        material = slots[material_index].material if material_index < len(slots) else None
+        if material is not None:
+            if material.name not in materials:
+                materials.append(material.name)
+                data.setdefault("materials", []).append(fast_material(material))
+            primitive["material"] = materials.index(material.name)
+        primitives.append(primitive)
+    data["meshes"] = [ { "name": obj.data.name, "primitives": primitives } ]
+
+    node = { "name": obj.name, "mesh": 0 }
+    translation, rotation, scale = (_YUP @ matrix @ _YUP.inverted()).decompose()
+    if translation.length > 0:
+        node["translation"] = list(translation)
+    if rotation != Quaternion():
+        node["rotation"] = [ rotation.x, rotation.y, rotation.z, rotation.w ]
+    if scale != Vector(( 1, 1, 1 )):
+        node["scale"] = list(scale)
+    extras = { K: _extras_value(obj[K]) for K in obj.keys() if not K.startswith("_") and _extras_value(obj[K]) is not None }
+    if extras:
+        node["extras"] = extras
+    data["nodes"] = [ node ]
+    binary = b"".join(chunks)
+    data["buffers"].append({ "byteLength": len(binary) })
+    return data, binary
+
+def write_fast_gltf(filepath, scene, obj):
+    # same file as export_gltf for a mesh accepted by fast_writer_reason, without the glTF exporter
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        data, binary = fast_gltf_data(obj, evaluated.matrix_world, mesh)
+    finally:
+        evaluated.to_mesh_clear()
+    path = filepath + asset_extension(scene)
+    if scene.s_export_format == 'GLTF_SEPARATE':
+        bin_name = os.path.basename(filepath) + ".bin"
+        with open(os.path.join(os.path.dirname(path), bin_name), "wb") as file:
+            file.write(binary)
+        data["buffers"][0]["uri"] = urllib.parse.quote(bin_name)
+        with open(path, "w") as file:
+            json.dump(data, file, separators=(',', ':'))
+    else:
+        save_gltf(path, data, binary)
+
+def export_model(filepath, scene, obj, fast):
+    # fast: obj accepted by fast_writer_reason, written without the glTF exporter
+    if fast:
+        write_fast_gltf(filepath, scene, obj)
+    else:
+        export_gltf(filepath, scene, obj)
+
+
+# ------------------------------------------- TEXTURE STORE
+# longest texture side for each texture profile (0 = original size)
+TEXTURE_PROFILES = { 'ORIGINAL': 0, 'DESKTOP': 4096, 'MOBILE': 2048, 'STANDALONE': 1024 }
+TEXTURE_FORMATS = { 'PNG': "image/png", 'JPEG': "image/jpeg", 'WEBP': "image/webp" }
+
+def texture_settings(scene):
+    # None when the texture store is off, else the processing applied to every stored texture
+    if not scene.b_texture_store:
+        return None
+    return { "max_size": TEXTURE_PROFILES[scene.s_texture_profile], "pot": scene.b_texture_pot, "format": scene.s_texture_format, "quality": scene.i_texture_quality }
+
+def new_texture_stats(store_dir):
+    return { "references": 0, "referenced_bytes": 0, "stored": set(), "stored_bytes": 0, "sources": set(),
+             "encoded": 0, "cache_hits": 0, "cache": load_texture_cache(store_dir) }
+
+def load_texture_cache(store_dir):
+    # source hash + settings -> name of the processed texture in the store
+    try:
+        with open(os.path.join(store_dir, PATH_TEXTURE_CACHE), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_texture_cache(store_dir, cache):
+    with open(os.path.join(store_dir, PATH_TEXTURE_CACHE), "w") as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+
+def _count_texture(stats, name, source_size, stored_size):
+    stats["references"] += 1
+    stats["referenced_bytes"] += source_size
+    if name not in stats["stored"]:
+        stats["stored"].add(name)
+        stats["stored_bytes"] += stored_size
+
+def store_texture(content, mime, store_dir, stats, source_size=None):
+    # write the texture once, named by its content hash: returns the file name
+    name = hashlib.sha256(content).hexdigest()[:32] + IMAGE_EXTENSIONS.get(mime, ".png")
+    path = os.path.join(store_dir, name)
+    if not os.path.exists(path):
+        with open(path, "wb") as file:
+            file.write(content)
+    _count_texture(stats, name, len(content) if source_size is None else source_size, len(content))
+    return name
+
+def _pot(n):
+    # nearest power of two
+    lower = 1 << (n.bit_length() - 1)
+    return lower if n - lower <= lower * 2 - n else lower * 2
+
+def texture_size(width, height, max_size, pot):
+    scale = 1.0
+    if max_size and max(width, height) > max_size:
+        scale = max_size / max(width, height)
+    width = max(1, round(width * scale))
+    height = max(1, round(height * scale))
+    if pot:
+        width, height = _pot(width), _pot(height)
+        while max_size and max(width, height) > max_size:
+            width, height = max(1, width // 2), max(1, height // 2)
+    return width, height
+
+def _has_alpha(content, mime):
+    # read from the file header: PNG color type or WebP VP8X/VP8L flags
+    if mime == "image/png" and len(content) > 25:
+        return content[25] in (4, 6)
+    if mime == "image/webp" and len(content) > 20:
+        if content[12:16] == b"VP8X":
+            return bool(content[20] & 0x10)
+        return content[12:16] == b"VP8L"
+    return False
+
+def _image_size(content, mime):
+    # (width, height) read from the file header of a PNG, JPEG or WebP image, None when unknown
+    if mime == "image/png" and content[12:16] == b"IHDR":
+        return int.from_bytes(content[16:20], "big"), int.from_bytes(content[20:24], "big")
+    if mime == "image/jpeg":
+        i = 2
+        while i + 9 < len(content) and content[i] == 0xFF:
+            marker = content[i + 1]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                return int.from_bytes(content[i + 7:i + 9], "big"), int.from_bytes(content[i + 5:i + 7], "big")
+            i += 2 + int.from_bytes(content[i + 2:i + 4], "big")
+        return None
+    if mime == "image/webp" and len(content) > 30:
+        chunk = content[12:16]
+        if chunk == b"VP8X":
+            return int.from_bytes(content[24:27], "little") + 1, int.from_bytes(content[27:30], "little") + 1
+        if chunk == b"VP8L":
+            bits = int.from_bytes(content[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8 ":
+            return int.from_bytes(content[26:28], "little") & 0x3FFF, int.from_bytes(content[28:30], "little") & 0x3FFF
+    return None
+
+def save_image(img, filepath, file_format, quality, alpha, scene, standard_view):
+    # save with the scene render settings, standard_view: without the view transform of the scene (textures),
+    # otherwise through it (lightmaps, as they were always saved)
+    settings = scene.render.image_settings
+    view = scene.view_settings
+    original = ( settings.file_format, settings.color_mode, settings.quality, settings.color_depth, view.view_transform, view.look, view.exposure, view.gamma )
+    try:
+        settings.file_format = file_format
+        if file_format == 'PNG':
+            settings.color_depth = '8'
+        settings.color_mode = 'RGBA' if alpha and file_format != 'JPEG' else 'RGB'
+        settings.quality = quality
+        if standard_view:
+            view.view_transform = 'Standard'
+            view.look = 'None'
+            view.exposure = 0.0
+            view.gamma = 1.0
+        img.save_render(filepath, scene=scene)
+    finally:
+        settings.file_format, settings.color_mode, settings.quality = original[0], original[1], original[2]
+        # after the format: the depths available depend on it (16 bit TIFF, 32 bit EXR)
+        settings.color_depth = original[3]
+        view.view_transform, view.look, view.exposure, view.gamma = original[4:]
+
+def encode_texture(content, mime, settings, scene):
+    # resize and re-encode one texture: returns the new content and mime type
+    file_format = settings["format"]
+    if file_format == 'KEEP':
+        file_format = { "image/jpeg": 'JPEG', "image/webp": 'WEBP' }.get(mime, 'PNG')
+    alpha = _has_alpha(content, mime)
+    if file_format == 'JPEG' and alpha:
+        file_format = 'PNG'
+    tmp_dir = tempfile.mkdtemp(prefix="aframe_texture_")
+    try:
+        source = os.path.join(tmp_dir, "source" + IMAGE_EXTENSIONS.get(mime, ".png"))
+        with open(source, "wb") as file:
+            file.write(content)
+        img = bpy.data.images.load(source)
+        try:
+            width, height = texture_size(img.size[0], img.size[1], settings["max_size"], settings["pot"])
+            if (width, height) == tuple(img.size) and TEXTURE_FORMATS[file_format] == mime:
+                return content, mime
+            if (width, height) != tuple(img.size):
+                img.scale(width, height)
+            target = os.path.join(tmp_dir, "texture" + IMAGE_EXTENSIONS[TEXTURE_FORMATS[file_format]])
+            save_image(img, target, file_format, settings["quality"], alpha, scene, True)
+        finally:
+            bpy.data.images.remove(img)
+        with open(target, "rb") as file:
+            return file.read(), TEXTURE_FORMATS[file_format]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def optimized_texture(content, mime, settings, store_dir, stats, scene):
+    # processed texture in the store, encoded only once for the same source and settings
+    key = hashlib.sha256(content).hexdigest() + ":" + json.dumps(settings, sort_keys=True)
+    name = stats["cache"].get(key)
+    if name and os.path.exists(os.path.join(store_dir, name)):
+        stats["cache_hits"] += 1
+        _count_texture(stats, name, len(content), os.path.getsize(os.path.join(store_dir, name)))
+        return name
+    encoded, encoded_mime = encode_texture(content, mime, settings, scene)
+    stats["encoded"] += 1
+    name = store_texture(encoded, encoded_mime, store_dir, stats, len(content))
+    stats["cache"][key] = name
+    return name
+
+def store_textures(path, store_dir, stats, settings, scene):
+    # move the images of an exported asset to the shared texture store and point the asset to them
+    data, binary = load_gltf(path)
+    images = data.get("images", [])
+    if not images:
+        return
+    base_dir = os.path.dirname(path)
+    optimize = settings["max_size"] or settings["pot"] or settings["format"] != 'KEEP'
+    removed = set()
+    for image in images:
+        mime = image.get("mimeType", "image/png")
+        uri = image.get("uri", "")
+        if "bufferView" in image:
+            view = data["bufferViews"][image["bufferView"]]
+            start = view.get("byteOffset", 0)
+            content = binary[start:start+view["byteLength"]]
+            removed.add(image.pop("bufferView"))
+        elif uri.startswith("data:"):
+            header, encoded = uri.split(",", 1)
+            mime = header[5:].split(";")[0]
+            content = base64.b64decode(encoded)
+        elif uri:
+            source = os.path.normpath(os.path.join(base_dir, urllib.parse.unquote(uri)))
+            with open(source, "rb") as file:
+                content = file.read()
+            stats["sources"].add(source)
+        else:
+            continue
+        if optimize:
+            name = optimized_texture(content, mime, settings, store_dir, stats, scene)
+        else:
+            name = store_texture(content, mime, store_dir, stats)
+        image["uri"] = PATH_TEXTURES + name
+        image["mimeType"] = TEXTURE_FORMATS.get({ ".jpg": 'JPEG', ".webp": 'WEBP' }.get(os.path.splitext(name)[1], 'PNG'))
+    if removed:
+        binary = compact_buffer(data, binary, removed)
+    save_gltf(path, data, binary)
+
+def finish_texture_store(store_dir, stats, report):
+    # remove the named copies written by the glTF exporter (separate format), now replaced by the hashed ones
+    for source in stats["sources"]:
+        if os.path.basename(source) not in stats["stored"] and os.path.exists(source):
+            os.remove(source)
+    save_texture_cache(store_dir, stats["cache"])
+    saved = stats["referenced_bytes"] - stats["stored_bytes"]
+    report.append("[TEXTURES] "+str(stats["references"])+" texture references, "+str(len(stats["stored"]))+" unique textures")
+    report.append("[TEXTURES] "+str(stats["encoded"])+" textures resized/re-encoded, "+str(stats["cache_hits"])+" taken from the texture cache")
+    report.append("[TEXTURES] "+str(stats["referenced_bytes"])+" bytes referenced, "+str(stats["stored_bytes"])+" bytes stored, "+str(saved)+" bytes saved")
+    return saved
+
+def write_report(report):
+    # the export report is kept inside the blend file (Text Editor) and printed to the console
+    text = bpy.data.texts.get(PATH_REPORT) or bpy.data.texts.new(PATH_REPORT)
+    text.from_string("\n".join(report) + "\n")
+    for line in report:
+        print(line)
+
+
+# ------------------------------------------- PARALLEL EXPORT
+# Python code run by every background blender worker: sys.argv ends with [addon parent dir, addon module, job file]
+_WORKER_EXPR = "import sys, importlib; sys.path.insert(0, sys.argv[-3]); importlib.import_module(sys.argv[-2]).run_export_worker(sys.argv[-1])"
+
+def export_gltf_parallel(jobs, scene, workers):
+    # jobs: list of [object name, filepath, 'CENTER' or 'TRANSFORM' (see set_export_transform), LOD ratio (1.0 = full mesh)] exported by "blender -b" workers, one shard per worker
+    if not jobs:
+        return
+    workers = max(1, min(workers, len(jobs)))
+    addon_dir = os.path.dirname(os.path.realpath(__file__))
+    tmp_dir = tempfile.mkdtemp(prefix="aframe_export_")
+    shard_dirs = []
+    try:
+        # the copy contains the batch objects built by the main export loop, the workers move the objects themselves
+        blend_copy = os.path.join(tmp_dir, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blend_copy, copy=True)
+        processes = []
+        for i in range(workers):
+            # each worker writes in its own directory next to the assets (GLTF_SEPARATE textures of the same image
+            # would be written by several workers at the same time), the files are renamed into assets/ at the end
+            shard_dir = tempfile.mkdtemp(prefix=".shard_"+str(i)+"_", dir=os.path.dirname(jobs[0][1]))
+            shard = [ [ name, os.path.join(shard_dir, os.path.basename(filepath)), clear, ratio ] for name, filepath, clear, ratio in jobs[i::workers] ]
+            shard_dirs.append(shard_dir)
+            shard_blend = os.path.join(tmp_dir, "shard_"+str(i)+".blend")
+            shutil.copyfile(blend_copy, shard_blend)
+            job_path = os.path.join(tmp_dir, "shard_"+str(i)+".json")
+            with open(job_path, "w") as file:
+                json.dump({"scene": scene.name, "exports": shard}, file)
+            cmd = [ bpy.app.binary_path, "-b", "--factory-startup", shard_blend, "--python-exit-code", "1", "--python-expr", _WORKER_EXPR, "--", os.path.dirname(addon_dir), __name__, job_path ]
+            print("[PARALLEL] worker "+str(i)+": "+str(len(shard))+" objects")
+            processes.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT))
+        failed = []
+        for i, process in enumerate(processes):
+            output, _ = process.communicate()
+            if process.returncode != 0:
+                print(output.decode(errors="replace"))
+                failed.append(str(i))
+        if failed:
+            raise RuntimeError("glTF export worker(s) "+", ".join(failed)+" failed")
+        for i, shard_dir in enumerate(shard_dirs):
+            for name, filepath, clear, ratio in jobs[i::workers]:
+                # the model first, then its .bin and textures (the same texture of another shard is replaced by an identical file)
+                for f in asset_files(scene, shard_dir, os.path.basename(filepath) + asset_extension(scene)):
+                    source = os.path.join(shard_dir, f)
+                    if not os.path.exists(source):
+                        continue # texture of an earlier job of the shard, already moved
+                    target = os.path.join(os.path.dirname(filepath), f)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(source, target)
+    finally:
+        for shard_dir in shard_dirs:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def run_export_worker(job_path):
+    # entry point of a background worker: export each object exactly like the serial loop does
+    with open(job_path, "r") as file:
+        job = json.load(file)
+    try:
+        register()
+    except ValueError:
+        pass # already registered as an enabled add-on
+    scene = bpy.data.scenes[job["scene"]]
+    deselect_objects(bpy.context.view_layer)
+    for name, filepath, clear, ratio in job["exports"]:
+        obj = bpy.data.objects[name]
+        obj.select_set(state=True)
+        saved = set_export_transform(obj, clear)
+        if ratio < 1.0:
+            modifier = add_lod_modifier(obj, ratio)
+            export_gltf(filepath, scene, obj)
+            obj.modifiers.remove(modifier)
+        else:
+            export_gltf(filepath, scene, obj)
+        restore_transform(obj, saved)
+        obj.select_set(state=False)
+        print("[PARALLEL] exported "+os.path.basename(filepath))
+
+
+# ------------------------------------------- SHARED MESHES
+def shared_mesh_assets(objects):
+    # linked duplicates (same mesh, materials and modifiers) are exported once: object name -> shared asset name
+    groups = {}
+    for obj in objects:
+        if obj.type != 'MESH' or obj.data.users < 2 or obj.parent is not None:
+            continue
+        if obj.animation_data and obj.animation_data.action:
+            continue
+        if any(K in obj.keys() for K in (AFRAME_VIDEO, AFRAME_IMAGES, "AFRAME_NOGLTF")):
+            continue
+        materials = tuple(slot.material.name if slot.material else "" for slot in obj.material_slots)
+        modifiers = tuple(mod.type + ":" + _rna_signature(mod) for mod in obj.modifiers)
+        groups.setdefault((obj.data.name, materials, modifiers, str(obj.get(AFRAME_COMPRESSION, "")), str(obj.get(AFRAME_LOD, ""))), []).append(obj.name)
+    shared = {}
+    used = set(obj.name for obj in objects)
+    for key, names in groups.items():
+        if len(names) < 2:
+            continue
+        asset_name = SHARED_MESH_PREFIX + key[0]
+        n = 1
+        while asset_name in used:
+            asset_name = SHARED_MESH_PREFIX + key[0] + "." + str(n).zfill(3)
+            n += 1
+        used.add(asset_name)
+        for name in names:
+            shared[name] = asset_name
+    return shared
+
+def aframe_transform(matrix):
+    # position, rotation (degrees, A-Frame YXZ order) and scale attributes of a blender matrix in y-up space
+    location, rotation, scale = matrix.decompose()
+    euler = Quaternion((rotation.w, rotation.x, rotation.z, -rotation.y)).to_euler('ZXY')
+    position = str(location.x)+" "+str(location.z)+" "+str(-location.y)
+    degrees = str(math.degrees(euler.x))+" "+str(math.degrees(euler.y))+" "+str(math.degrees(euler.z))
+    return position, degrees, str(scale.x)+" "+str(scale.z)+" "+str(scale.y)
+
+
+# ------------------------------------------- INCREMENTAL EXPORT
+# RNA properties that only affect the Blender UI, not the exported data
+_RNA_SKIP = { "rna_type", "location", "width", "width_hidden", "height", "dimensions", "select", "show_options", "show_preview", "show_texture", "show_expanded", "show_in_editmode", "show_on_cage", "is_override_data_editable" }
+
+def _plain(value):
+    # convert blender values (vectors, matrices, id properties, sets) to plain python values
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, set):
+        return tuple(sorted(value))
+    if hasattr(value, "to_dict"):
+        return _plain(value.to_dict())
+    if isinstance(value, dict):
+        return tuple((k, _plain(value[k])) for k in sorted(value))
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    try:
+        return tuple(_plain(v) for v in value)
+    except TypeError:
+        return getattr(value, "name", None)
+
+def _rna_signature(struct):
+    # text representation of the editable RNA properties of a struct (modifier, node, material)
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in _RNA_SKIP or prop.type == 'COLLECTION':
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if prop.type == 'POINTER':
+            value = getattr(value, "name", None)
+        values.append(prop.identifier + "=" + repr(_plain(value)))
+    return ";".join(values)
+
+def _hash_values(h, collection, attr, size, typecode):
+    # feed a bpy collection attribute to the hash without building python objects
+    values = array.array(typecode, [0]) * (len(collection) * size)
+    if len(values):
+        collection.foreach_get(attr, values)
+    h.update(values.tobytes())
+
+def _hash_mesh(h, mesh):
+    _hash_values(h, mesh.vertices, "co", 3, 'f')
+    _hash_values(h, mesh.loops, "vertex_index", 1, 'i')
+    _hash_values(h, mesh.polygons, "loop_start", 1, 'i')
+    _hash_values(h, mesh.polygons, "material_index", 1, 'i')
+    _hash_values(h, mesh.polygons, "use_smooth", 1, 'i')
+    h.update(repr((getattr(mesh, "use_auto_smooth", None), getattr(mesh, "auto_smooth_angle", None))).encode())
+    for uv in mesh.uv_layers:
+        h.update(uv.name.encode())
+        _hash_values(h, uv.data, "uv", 2, 'f')
+    for attr in getattr(mesh, "color_attributes", []):
+        h.update(attr.name.encode())
+        _hash_values(h, attr.data, "color", 4, 'f')
+    if mesh.shape_keys:
+        for key in mesh.shape_keys.key_blocks:
+            h.update((key.name + repr(key.value)).encode())
+            _hash_values(h, key.data, "co", 3, 'f')
+
+def _image_digest(image, image_digests):
+    # images are shared between objects, hash each one once per export
+    if image.name in image_digests:
+        return image_digests[image.name]
+    h = hashlib.sha1(image.name.encode())
+    h.update(repr((image.source, tuple(image.size), image.colorspace_settings.name, image.alpha_mode)).encode())
+    if image.packed_file:
+        h.update(image.packed_file.data)
+    elif image.source == 'FILE':
+        path = bpy.path.abspath(image.filepath)
+        try:
+            st = os.stat(path)
+            h.update((path + ":" + str(st.st_mtime_ns) + ":" + str(st.st_size)).encode())
+        except OSError:
+            h.update(path.encode())
+    elif image.has_data:
+        pixels = array.array('f', [0.0]) * len(image.pixels)
+        image.pixels.foreach_get(pixels)
+        h.update(pixels.tobytes())
+    image_digests[image.name] = h.hexdigest()
+    return image_digests[image.name]
+
+def _hash_node_tree(h, tree, image_digests, visited):
+    if tree is None or tree.name in visited:
+        return
+    visited.add(tree.name)
+    for node in tree.nodes:
+        h.update((node.bl_idname + ":" + node.name + ":" + _rna_signature(node)).encode())
+        for socket in node.inputs:
+            if hasattr(socket, "default_value") and not socket.is_linked:
+                h.update(repr(_plain(socket.default_value)).encode())
+        image = getattr(node, "image", None)
+        if image is not None:
+            h.update(_image_digest(image, image_digests).encode())
+        if getattr(node, "node_tree", None) is not None:
+            _hash_node_tree(h, node.node_tree, image_digests, visited)
+    for link in tree.links:
+        h.update((link.from_node.name + "." + link.from_socket.identifier + ">" + link.to_node.name + "." + link.to_socket.identifier).encode())
+
+def object_hash(obj, scene, image_digests, clear=None):
+    # content hash of everything that ends up in the object's glTF file, read before set_export_transform:
+    # clear 'CENTER' keeps only rotation and scale in the file, 'TRANSFORM' no transform, None the whole transform (watch mode)
+    h = hashlib.sha1(obj.type.encode())
+    h.update(repr(sorted(gltf_export_options(scene, obj).items())).encode())
+    h.update(repr(texture_settings(scene)).encode())
+    h.update(repr(scene.b_fast_writer).encode())
+    if clear == 'CENTER':
+        h.update(repr(_plain(obj.matrix_world.to_3x3())).encode())
+    elif clear is None:
+        h.update(repr(_plain(obj.matrix_basis)).encode())
+        if obj.parent:
+            h.update(repr(_plain(obj.parent.matrix_world)).encode())
+    for K in sorted(obj.keys()):
+        if K != '_RNA_UI':
+            h.update((K + "=" + repr(_plain(obj[K]))).encode())
+    if obj.type == 'MESH':
+        _hash_mesh(h, obj.data)
+    for mod in obj.modifiers:
+        h.update((mod.type + ":" + _rna_signature(mod)).encode())
+    visited = set()
+    for slot in obj.material_slots:
+        h.update(slot.link.encode())
+        if slot.material:
+            h.update((slot.material.name + ":" + _rna_signature(slot.material)).encode())
+            if slot.material.use_nodes:
+                _hash_node_tree(h, slot.material.node_tree, image_digests, visited)
+    anim = obj.animation_data
+    if anim and anim.action:
+        for fc in anim.action.fcurves:
+            h.update((fc.data_path + str(fc.array_index)).encode())
+            _hash_values(h, fc.keyframe_points, "co", 2, 'f')
+    return h.hexdigest()
+
+def load_manifest(path):
+    # manifest entries: object name -> {"hash": content hash, "files": exported files}
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("objects", {})
+
+def save_manifest(path, entries):
+    with open(path, "w") as file:
+        json.dump({"version": MANIFEST_VERSION, "objects": entries}, file, indent=1, sort_keys=True)
+
+def is_cached(entries, name, digest, directory):
+    entry = entries.get(name)
+    if entry is None or entry.get("hash") != digest:
+        return False
+    return all(os.path.exists(os.path.join(directory, f)) for f in entry.get("files", []))
+
+
+# ------------------------------------------- LIGHTMAPS
+LIGHTMAP_SUFFIX = "_baked"
+ATLAS_PREFIX = "atlas_"
+ATLAS_PADDING = 2
+ATLAS_EXTENSIONS = ( ".png", ".jpg", ".jpeg", ".webp" )
+PATH_LIGHTMAP_CACHE = "lightmap_cache.json"
+LIGHTMAP_FORMATS = { 'PNG': ".png", 'JPEG': ".jpg", 'WEBP': ".webp" }
+
+def lightmap_index(files):
+    # lightmap file of each "<object>_baked" stem, built once per export
+    index = {}
+    for file in sorted(files):
+        stem, ext = os.path.splitext(file)
+        if stem.endswith(LIGHTMAP_SUFFIX):
+            index.setdefault(stem, file)
+    return index
+
+def pack_atlas(sizes, atlas_size, padding=ATLAS_PADDING):
+    # shelf packing, tallest first: stem -> (atlas number, x, y from the top left corner), None if too big
+    placements = {}
+    atlas, x, y, shelf = 0, 0, 0, 0
+    for stem, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if width > atlas_size or height > atlas_size:
+            placements[stem] = None
+            continue
+        if x + width > atlas_size:
+            x, y, shelf = 0, y + shelf + padding, 0
+        if y + height > atlas_size:
+            atlas, x, y, shelf = atlas + 1, 0, 0, 0
+        placements[stem] = ( atlas, x, y )
+        x += width + padding
+        shelf = max(shelf, height)
+    return placements
+
+def build_lightmap_atlases(directory, lightmaps, atlas_size, report):
+    # pack the lightmaps in atlas_<n>.png: stem -> (atlas file, uv offset, uv repeat)
+    images = {}
+    for stem, file in lightmaps.items():
+        if file.lower().endswith(ATLAS_EXTENSIONS):
+            img = bpy.data.images.load(os.path.join(directory, file))
+            if img.channels == 4 and img.size[0] > 0:
+                images[stem] = img
+            else:
+                bpy.data.images.remove(img)
+    placements = pack_atlas({ stem: tuple(img.size) for stem, img in images.items() }, atlas_size)
+    count = max([ p[0] + 1 for p in placements.values() if p ] or [ 0 ])
+    atlases = {}
+    for n in range(count):
+        pixels = array.array('f', bytes(4 * atlas_size * atlas_size * 4))
+        for stem, placement in placements.items():
+            if placement is None or placement[0] != n:
+                continue
+            img = images[stem]
+            width, height = img.size
+            buf = array.array('f', bytes(4 * width * height * 4))
+            img.pixels.foreach_get(buf)
+            # blender rows start from the bottom, uv placements from the top
+            first_row = atlas_size - placement[2] - height
+            for row in range(height):
+                start = ((first_row + row) * atlas_size + placement[1]) * 4
+                pixels[start:start + width * 4] = buf[row * width * 4:(row + 1) * width * 4]
+            offset = str(placement[1] / atlas_size)+" "+str(placement[2] / atlas_size)
+            repeat = str(width / atlas_size)+" "+str(height / atlas_size)
+            atlases[stem] = ( ATLAS_PREFIX+str(n + 1)+".png", offset, repeat )
+        atlas = bpy.data.images.new(ATLAS_PREFIX+str(n + 1), atlas_size, atlas_size, alpha=False)
+        atlas.pixels.foreach_set(pixels)
+        # raw save: the atlas keeps the lightmap pixels as they are
+        atlas.filepath_raw = os.path.join(directory, ATLAS_PREFIX+str(n + 1)+".png")
+        atlas.file_format = 'PNG'
+        atlas.save()
+        bpy.data.images.remove(atlas)
+    for img in images.values():
+        bpy.data.images.remove(img)
+    report.append("[LIGHTMAP] "+str(len(atlases))+" lightmaps packed in "+str(count)+" atlases of "+str(atlas_size)+" px")
+    return atlases
+
+
+def load_lightmap_cache(directory):
+    # "saved": image name -> {hash, file, stat}, "loaded": file -> {hash, stat}
+    try:
+        with open(os.path.join(directory, PATH_LIGHTMAP_CACHE), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_lightmap_cache(directory, cache):
+    with open(os.path.join(directory, PATH_LIGHTMAP_CACHE), "w") as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+
+def file_signature(path):
+    # [mtime, size] of a file, None if missing
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [ stat.st_mtime_ns, stat.st_size ]
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def pixel_digests(images, workers):
+    # image name -> hash of its pixels; pixels are read on the main thread, hashed by a thread pool (hashlib releases the GIL)
+    digests = {}
+    workers = max(1, workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(images), workers):
+            chunk = images[i:i + workers]
+            buffers = []
+            for img in chunk:
+                buf = array.array('f', bytes(4 * len(img.pixels)))
+                img.pixels.foreach_get(buf)
+                buffers.append(buf)
+            for img, digest in zip(chunk, pool.map(lambda buf: hashlib.sha256(memoryview(buf)).hexdigest(), buffers)):
+                digests[img.name] = digest
+    return digests
+
+def file_digests(paths, workers):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(zip(paths, pool.map(file_digest, paths)))
+
+
+# ------------------------------------------- LOD
+# decimated variants of a mesh are exported as <asset>_lod1, <asset>_lod2, ...
+LOD_SUFFIX = "_lod"
+LOD_MODIFIER = "AFRAME_LOD_DECIMATE"
+
+def parse_floats(text):
+    values = []
+    for item in str(text).replace(";", ",").split(","):
+        try:
+            values.append(float(item))
+        except ValueError:
+            pass
+    return values
+
+def lod_ratios(scene, obj):
+    # AFRAME_LOD custom property (comma separated ratios, 0 disables) overrides the project ratios
+    if AFRAME_LOD in obj.keys():
+        text = obj[AFRAME_LOD]
+    elif scene.b_lod:
+        text = scene.s_lod_ratios
+    else:
+        return []
+    return [ ratio for ratio in parse_floats(text) if 0.0 < ratio < 1.0 ]
+
+def lod_attribute(scene, levels):
+    # lod component of an entity: level urls and the camera distance where each level starts
+    if not levels:
+        return ()
+    distances = [ d for d in parse_floats(scene.s_lod_distances) if d > 0.0 ] or [ 10.0 ]
+    while len(distances) < len(levels):
+        distances.append(distances[-1] * 2)
+    return ( ("lod", "levels: "+", ".join(levels)+"; distances: "+", ".join(str(d) for d in distances[:len(levels)])), )
+
+def add_lod_modifier(obj, ratio):
+    # temporary decimate modifier, applied by the glTF exporter (export_apply)
+    modifier = obj.modifiers.new(LOD_MODIFIER, 'DECIMATE')
+    modifier.ratio = ratio
+    return modifier
+
+def triangle_count(obj):
+    # triangles of the evaluated mesh (modifiers applied)
+    evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = evaluated.to_mesh()
+    mesh.calc_loop_triangles()
+    count = len(mesh.loop_triangles)
+    evaluated.to_mesh_clear()
+    return count
+
+
+# ------------------------------------------- STREAMING
+# streaming export: glTF models are grouped in square cells and loaded by the page when the player is near
+PATH_CELLS = "cells.json"
+
+def cell_id(position, size):
+    # cell of a blender position on the A-Frame ground plane (x, -y)
+    return str(math.floor(position.x / size))+"_"+str(math.floor(-position.y / size))
+
+def add_to_cell(cells, size, position, entity_id, src):
+    cell = cells.setdefault(cell_id(position, size), { "entities": [], "assets": [] })
+    cell["entities"].append([ entity_id, src ])
+    if src not in cell["assets"]:
+        cell["assets"].append(src)
+
+def write_cells(path, cells, size):
+    # cells.json: cell id -> centre, [entity id, model url] pairs and the asset list of the cell
+    for key, cell in cells.items():
+        ix, iz = (int(i) for i in key.split("_"))
+        cell["center"] = [ (ix + 0.5) * size, (iz + 0.5) * size ]
+    with open(path, "w") as file:
+        json.dump({ "cellSize": size, "cells": cells }, file, indent=1, sort_keys=True)
+
+
+# ------------------------------------------- STATIC BATCHING
+BATCH_PREFIX = "batch_"
+# custom properties that make an object interactive or animated: never batched
+_BATCH_EXCLUDED_KEYS = ( AFRAME_HTTP_LINK, AFRAME_ANIMATION, AFRAME_VIDEO, AFRAME_IMAGES, "AFRAME_SHOW_HIDE_OBJECT", "AFRAME_TAG", "AFRAME_NOGLTF", "AFRAME_CUBEMAP", AFRAME_LOD )
+
+def draw_calls(objects):
+    # one draw call per material of every mesh entity
+    return sum(max(1, len(obj.material_slots)) for obj in objects if obj.type == 'MESH')
+
+def batch_groups(objects, lightmaps, cell_size=None):
+    # static meshes sharing the same materials (and cell): batch key -> objects, only groups of 2 or more
+    toggled = set(str(obj["AFRAME_SHOW_HIDE_OBJECT"]) for obj in objects if "AFRAME_SHOW_HIDE_OBJECT" in obj.keys())
+    groups = {}
+    for obj in objects:
+        if obj.type != 'MESH' or obj.name in toggled or obj.children:
+            continue
+        if obj.animation_data and obj.animation_data.action:
+            continue
+        if any(K in obj.keys() for K in _BATCH_EXCLUDED_KEYS):
+            continue
+        if obj.name+LIGHTMAP_SUFFIX in lightmaps:
+            continue # lightmaps are mapped per object
+        materials = tuple(slot.material.name if slot.material else "" for slot in obj.material_slots)
+        key = (materials, str(obj.get(AFRAME_COMPRESSION, "")))
+        if cell_size:
+            center = obj.matrix_world @ (sum((Vector(corner) for corner in obj.bound_box), Vector()) / 8)
+            key += (cell_id(center, cell_size),)
+        groups.setdefault(key, []).append(obj)
+    return [ group for group in groups.values() if len(group) > 1 ]
+
+def build_batch(name, objects, scene):
+    # new object with the evaluated meshes of objects merged in world space, linked to the scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    bm = bmesh.new()
+    for obj in objects:
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        mesh.transform(obj.matrix_world)
+        bm.from_mesh(mesh)
+        evaluated.to_mesh_clear()
+    data = bpy.data.meshes.new(name)
+    bm.to_mesh(data)
+    bm.free()
+    for slot in objects[0].material_slots:
+        data.materials.append(slot.material)
+    batch = bpy.data.objects.new(name, data)
+    if AFRAME_COMPRESSION in objects[0].keys():
+        batch[AFRAME_COMPRESSION] = objects[0][AFRAME_COMPRESSION]
+    scene.collection.objects.link(batch)
+    return batch
+
+def remove_batches(batches):
+    for batch in batches:
+        data = batch.data
+        bpy.data.objects.remove(batch)
+        bpy.data.meshes.remove(data)
+
+
+# ------------------------------------------- IMAGE SWAP
+PATH_SWAP = "swap/"
+IMAGE_ID_PREFIX = "image_"
+SWAP_ATLAS_MAX = 4
+_MEDIA_MIMES = { ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp" }
+
+def image_asset_ids(files):
+    # one collision-free asset id per media file: image_<file name>, numbered when two names give the same id
+    ids = {}
+    used = set()
+    for file in sorted(set(files)):
+        base = IMAGE_ID_PREFIX + "".join(c if c.isalnum() or c in "-_" else "_" for c in os.path.splitext(file)[0])
+        asset_id = base
+        n = 1
+        while asset_id in used:
+            asset_id = base + "_" + str(n)
+            n += 1
+        used.add(asset_id)
+        ids[file] = asset_id
+    return ids
+
+def _is_newer(target, sources):
+    return os.path.exists(target) and all(os.path.getmtime(target) >= os.path.getmtime(source) for source in sources)
+
+def capped_image(media_dir, file, max_size, scene, stats):
+    # copy of a media image with its longest side up to max_size in media/swap/, written again only when the source is newer:
+    # path relative to media/ (the file itself when there is no cap, no source or the image is already within the cap)
+    source = os.path.join(media_dir, file)
+    if not max_size or not os.path.isfile(source):
+        return file
+    mime = _MEDIA_MIMES.get(os.path.splitext(file)[1].lower(), "image/png")
+    # hash of the relative path in the name: photo.jpg / photo.jpeg and a/b.png / a_b.png get their own copy
+    key = hashlib.sha256(file.encode()).hexdigest()[:10]
+    name = PATH_SWAP + os.path.splitext(os.path.basename(file))[0] + "_" + key + "_" + str(max_size) + IMAGE_EXTENSIONS[mime]
+    target = os.path.join(media_dir, name)
+    if not _is_newer(target, [ source ]):
+        with open(source, "rb") as f:
+            content = f.read()
+        size = _image_size(content, mime)
+        if size and max(size) <= max_size:
+            if os.path.exists(target):
+                os.remove(target) # copy of a previous, larger source
+            return file
+        content, mime = encode_texture(content, mime, { "max_size": max_size, "pot": False, "format": 'KEEP', "quality": 90 }, scene)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(content)
+        stats["resized"] += 1
+    return name
+
+def build_swap_atlas(media_dir, files, max_size, stats):
+    # images of one swap set in a grid atlas, the atlas side is capped by max_size: (path relative to media/, columns, rows)
+    columns = math.ceil(math.sqrt(len(files)))
+    rows = math.ceil(len(files) / columns)
+    sources = [ os.path.join(media_dir, file) for file in files ]
+    name = PATH_SWAP + "atlas_" + hashlib.sha1((repr(files) + str(max_size)).encode()).hexdigest()[:12] + ".png"
+    target = os.path.join(media_dir, name)
+    if _is_newer(target, sources):
+        return name, columns, rows
+    images = [ bpy.data.images.load(source) for source in sources ]
+    try:
+        # every cell has the size of the first image
+        width, height = texture_size(images[0].size[0], images[0].size[1], max_size // max(columns, rows) if max_size else 0, False)
+        pixels = array.array('f', bytes(4 * width * columns * height * rows * 4))
+        for i, img in enumerate(images):
+            if tuple(img.size) != (width, height):
+                img.scale(width, height)
+            buf = array.array('f', bytes(4 * width * height * 4))
+            img.pixels.foreach_get(buf)
+            # blender rows start from the bottom, the cells are numbered from the top left corner
+            first_row = (rows - 1 - i // columns) * height
+            first_column = (i % columns) * width
+            for row in range(height):
+                start = ((first_row + row) * width * columns + first_column) * 4
+                pixels[start:start + width * 4] = buf[row * width * 4:(row + 1) * width * 4]
+        atlas = bpy.data.images.new("swap_atlas", width * columns, height * rows, alpha=True)
+        atlas.pixels.foreach_set(pixels)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        atlas.filepath_raw = target
+        atlas.file_format = 'PNG'
+        atlas.save()
+        bpy.data.images.remove(atlas)
+    finally:
+        for img in images:
+            bpy.data.images.remove(img)
+    stats["atlases"] += 1
+    return name, columns, rows
+
+def image_swap_nodes(media_dir, swaps, scene, report):
+    # swaps: [(a-image attributes, media files)], each file is declared once: returns asset nodes, entity nodes and the generated files (relative to media/)
+    max_size = TEXTURE_PROFILES[scene.s_image_profile]
+    stats = { "resized": 0, "atlases": 0 }
+    ids = image_asset_ids([ file for attrs, files in swaps for file in files ])
+    sources = {}
+    atlases = {}
+    entities = []
+    for attrs, files in swaps:
+        missing = [ file for file in files if not os.path.isfile(os.path.join(media_dir, file)) ]
+        for file in missing:
+            print("[IMAGES] missing media file "+file)
+        if not files:
+            continue
+        if scene.b_image_atlas and not missing and 1 < len(files) <= SWAP_ATLAS_MAX:
+            key = tuple(files)
+            if key not in atlases:
+                atlases[key] = build_swap_atlas(media_dir, files, max_size, stats)
+            name, columns, rows = atlases[key]
+            asset_id = IMAGE_ID_PREFIX + os.path.splitext(os.path.basename(name))[0]
+            sources[asset_id] = name
+            handler = "count: "+str(len(files))+"; columns: "+str(columns)+"; rows: "+str(rows)
+        else:
+            for file in files:
+                if ids[file] not in sources:
+                    sources[ids[file]] = capped_image(media_dir, file, max_size, scene, stats)
+            asset_id = ids[files[0]]
+            handler = "images: "+", ".join("#"+ids[file] for file in files)
+        entities.append(SceneNode('entity', "a-image", ( ("images-handler", handler), attrs[0], ("src", "#"+asset_id) ) + attrs[1:]))
+    assets = [ SceneNode('asset', "img", ( ("id", asset_id), ("src", "./"+PATH_MEDIA+path) ), 4) for asset_id, path in sources.items() ]
+    report.append("[IMAGES] "+str(len(entities))+" image swap entities, "+str(len(assets))+" images declared, "+str(stats["resized"])+" images resized, "+str(stats["atlases"])+" atlases written")
+    return assets, entities, [ path for path in sources.values() if path.startswith(PATH_SWAP) ]
+
+
+# ------------------------------------------- SCENE IR
+class SceneNode:
+    # one asset, entity or light of the page; attrs is a tuple of (name, value), value None for bare attributes
+    __slots__ = ("kind", "tag", "attrs", "indent")
+
+    def __init__(self, kind, tag, attrs, indent = 3):
+        self.kind = kind
+        self.tag = tag
+        self.attrs = tuple(attrs)
+        self.indent = indent
+
+# rendered html fragments of the last export, keyed by node content
+_fragments = {}
+
+def render_node(node, used):
+    key = (node.tag, node.attrs, node.indent)
+    fragment = _fragments.get(key)
+    if fragment is None:
+        parts = [ node.tag ]
+        for name, value in node.attrs:
+            if value is None:
+                parts.append(name)
+            else:
+                parts.append(name+'="'+html.escape(str(value))+'"')
+        fragment = "\n" + "\t" * node.indent + "<" + " ".join(parts) + "></" + node.tag + ">"
+    used[key] = fragment
+    return fragment
+
+def write_index(path, template, values, streams):
+    # substitute the template, then stream the node lists of the placeholders in streams to disk
+    global _fragments
+    markers = dict(values)
+    for key in streams:
+        markers[key] = "\0" + key + "\0"
+    text = Template(template).substitute(markers)
+    used = {}
+    reused = 0
+    with open(path, "w") as file:
+        for i, part in enumerate(text.split("\0")):
+            if i % 2 == 0:
+                file.write(part)
+                continue
+            for node in streams[part]:
+                if (node.tag, node.attrs, node.indent) in _fragments:
+                    reused += 1
+                file.write(render_node(node, used))
+    # keep only the fragments of this export
+    _fragments = used
+    return len(used), reused
+
+
+# ------------------------------------------- PRECOMPRESSION
+PRECOMPRESS_EXTENSIONS = ( ".gltf", ".html", ".js", ".css", ".json", ".svg", ".txt" )
+
+def precompress(directory, report):
+    # gzip sibling (file.gz) of every compressible file requested by the page, written again only when the file is newer
+    # exporter bookkeeping files, never served to the page
+    internal = { PATH_ASSETS + PATH_MANIFEST, PATH_SYNC_MANIFEST, PATH_LIGHTMAPS + PATH_LIGHTMAP_CACHE, PATH_ASSETS + PATH_TEXTURES + PATH_TEXTURE_CACHE, PATH_PROFILE }
+    written = 0
+    unchanged = 0
+    raw = 0
+    stored = 0
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            if name.endswith(".gz"):
+                if name[:-3].lower().endswith(PRECOMPRESS_EXTENSIONS) and (not os.path.exists(path[:-3]) or relative[:-3] in internal):
+                    os.remove(path) # its file is not exported anymore (or not served)
+                continue
+            if not name.lower().endswith(PRECOMPRESS_EXTENSIONS) or relative in internal:
+                continue
+            source = os.stat(path)
+            gz_path = path + ".gz"
+            if os.path.exists(gz_path) and os.stat(gz_path).st_mtime_ns >= source.st_mtime_ns:
+                unchanged += 1
+            else:
+                with open(path, "rb") as file:
+                    content = file.read()
+                with open(gz_path, "wb") as file:
+                    # fixed mtime: same content, same .gz
+                    with gzip.GzipFile(filename=name, mode="wb", fileobj=file, compresslevel=9, mtime=0) as gz_file:
+                        gz_file.write(content)
+                written += 1
+            raw += source.st_size
+            stored += os.path.getsize(gz_path)
+    report.append("[PRECOMPRESS] "+str(written)+" files compressed, "+str(unchanged)+" unchanged, "+str(raw)+" -> "+str(stored)+" bytes")
+
+
+# ------------------------------------------- RESOURCE SYNC
+PATH_SYNC_MANIFEST = "sync_manifest.json"
+SYNC_VERSION = 1
+FICLONE = 0x40049409 # linux ioctl: copy on write clone of a whole file
+
+def new_sync_stats():
+    return { "copied": 0, "copied_bytes": 0, "linked": 0, "skipped": 0, "skipped_bytes": 0, "pruned": 0, "pruned_bytes": 0 }
+
+def clone_file(src, dst):
+    # reflink when the filesystem supports it, else copy; True when no data was copied.
+    # never a hardlink: editing the project file would edit the source too (add-on resources, asset cache)
+    tmp = dst + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        import fcntl
+        with open(src, "rb") as source, open(tmp, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+        return True
+    except (ImportError, OSError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    # copy2 keeps the mtime: the next export sees the same signature and skips the file
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return False
+
+def sync_resources(src_dir, dest_dir, resources, stats):
+    # resources: [dest path, file name, overwrite], only missing or changed files are written
+    for dest_path, fname, overwrite in resources:
+        src = os.path.join(src_dir, fname)
+        dst = os.path.join(dest_dir, dest_path, fname)
+        signature = file_signature(dst)
+        if signature is not None and (not overwrite or signature == file_signature(src)):
+            stats["skipped"] += 1
+            stats["skipped_bytes"] += signature[1]
+            continue
+        if clone_file(src, dst):
+            stats["linked"] += 1
+        stats["copied"] += 1
+        stats["copied_bytes"] += os.path.getsize(src)
+
+def load_sync_manifest(path):
+    # outputs of the previous export, relative to the project directory
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return []
+    if data.get("version") != SYNC_VERSION:
+        return []
+    return data.get("outputs", [])
+
+def save_sync_manifest(path, outputs):
+    with open(path, "w") as file:
+        json.dump({"version": SYNC_VERSION, "outputs": sorted(outputs)}, file, indent=1)
+
+def prune_outputs(directory, outputs, previous, stats):
+    # remove the files of the previous export (sync manifest) not written by this one,
+    # files added by the user are never listed there and are kept
+    for output in sorted(set(previous) - set(outputs)):
+        path = os.path.join(directory, output)
+        for stale in ( path, path + ".gz" ):
+            if os.path.isfile(stale):
+                stats["pruned"] += 1
+                stats["pruned_bytes"] += os.path.getsize(stale)
+                os.remove(stale)
+                print("[SYNC] removed "+os.path.relpath(stale, directory))
+
+def sync_report(stats, report):
+    report.append("[SYNC] "+str(stats["copied"])+" files copied ("+str(stats["linked"])+" reflinked), "+str(stats["copied_bytes"])+" bytes")
+    report.append("[SYNC] "+str(stats["skipped"])+" files unchanged, "+str(stats["skipped_bytes"])+" bytes")
+    report.append("[SYNC] "+str(stats["pruned"])+" stale files removed, "+str(stats["pruned_bytes"])+" bytes")
+
+
+# ------------------------------------------- ASSET CACHE
+ASSET_CACHE_INDEX = "files.json"
+
+def asset_cache_dir(cache, digest, name):
+    # folder of one asset in the shared cache: content hash and asset name (the name is inside the glTF file)
+    key = hashlib.sha256((digest + ":" + name).encode()).hexdigest()
+    return os.path.join(cache, key[:2], key)
+
+def restore_asset(cache, digest, name, directory):
+    # copy the files of an asset exported by another project: file list relative to directory, None when not cached
+    folder = asset_cache_dir(cache, digest, name)
+    try:
+        with open(os.path.join(folder, ASSET_CACHE_INDEX), "r") as file:
+            files = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.isfile(os.path.join(folder, f)) for f in files):
+        return None
+    for f in files:
+        target = os.path.join(directory, f)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        clone_file(os.path.join(folder, f), target)
+    print("[ASSET CACHE] restored "+name)
+    return files
+
+def store_asset(cache, digest, name, directory, files):
+    # add an exported asset to the shared cache, renamed in place at the end: safe with concurrent exports
+    folder = asset_cache_dir(cache, digest, name)
+    if os.path.exists(os.path.join(folder, ASSET_CACHE_INDEX)):
+        return False
+    tmp = folder + ".tmp" + str(os.getpid())
+    try:
+        for f in files:
+            target = os.path.join(tmp, f)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            clone_file(os.path.join(directory, f), target)
+        with open(os.path.join(tmp, ASSET_CACHE_INDEX), "w") as file:
+            json.dump(files, file)
+        os.rename(tmp, folder) # fails when another export stored it first
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+    return True
+
+
+# ------------------------------------------- BATCH EXPORT
+
+def _prop_value(name, value):
+    # scene property value from a command line string, typed from _props
+    for p in _props:
+        if p[1] != name:
+            continue
+        if p[0] == 'bool':
+            if value.lower() not in ( "1", "0", "true", "false", "yes", "no", "on", "off" ):
+                raise ValueError("invalid boolean for "+name+": "+value)
+            return value.lower() in ( "1", "true", "yes", "on" )
+        if p[0] == 'int':
+            return int(value)
+        if p[0] == 'float':
+            return float(value)
+        if p[0] == 'enum' and value not in [ item[0] for item in p[4] ]:
+            raise ValueError("invalid value for "+name+": "+value+" (" + ", ".join(item[0] for item in p[4]) + ")")
+        return value
+    raise ValueError("unknown scene property "+name)
+
+def run_batch_export(job_path):
+    # entry point of a batch export process: job = { "file", "settings": { prop: string value }, "result" }
+    with open(job_path, "r") as file:
+        job = json.load(file)
+    result = { "file": job["file"], "status": "error", "output": "", "report": [], "error": "" }
+    started = time.perf_counter()
+    try:
+        register()
+        scene = bpy.context.scene
+        for name, value in job["settings"].items():
+            setattr(scene, name, _prop_value(name, value))
+        status = bpy.ops.aframe.export()
+        result["output"] = scene.s_output
+        if 'FINISHED' in status:
+            result["status"] = "ok"
+            text = bpy.data.texts.get(PATH_REPORT)
+            result["report"] = text.as_string().splitlines() if text else []
+        else:
+            result["error"] = "export status "+", ".join(sorted(status))
+    except Exception as e:
+        result["error"] = type(e).__name__+": "+str(e)
+        print("[BATCH] "+job["file"]+": "+result["error"])
+    result["time"] = round(time.perf_counter() - started, 3)
+    with open(job["result"], "w") as file:
+        json.dump(result, file, indent=1)
+
+
+# ------------------------------------------- PROFILING
+PATH_PROFILE = "export_profile.json"
+PROFILE_VERSION = 1
+
+class ExportProfile:
+    # wall time of the export phases and of the steps of every object, saved as JSON next to index.html
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.current = None
+        self.phase_started = self.started
+        self.phases = {}
+        self.objects = {}
+
+    def phase(self, name):
+        # end the running phase and start the next one (None: no phase)
+        now = time.perf_counter()
+        if self.current is not None:
+            self.phases[self.current] = self.phases.get(self.current, 0.0) + now - self.phase_started
+        self.current = name
+        self.phase_started = now
+
+    def add(self, name, step, started):
+        # step of one object, started = time.perf_counter() before the step
+        steps = self.objects.setdefault(name, {})
+        steps[step] = steps.get(step, 0.0) + time.perf_counter() - started
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        slowest = sorted(self.phases.items(), key=lambda item: -item[1])[:2]
+        return "%.2f s (%s)" % (self.total(), ", ".join("%s %.2f s" % item for item in slowest))
+
+    def write(self, path, outputs):
+        # outputs: written files, their sizes go in the report
+        self.phase(None)
+        directory = os.path.dirname(path)
+        data = {
+            "version": PROFILE_VERSION,
+            "addon": ".".join(str(v) for v in bl_info["version"]),
+            "blender": bpy.app.version_string,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total": round(self.total(), 4),
+            "phases": { name: round(seconds, 4) for name, seconds in self.phases.items() },
+            "objects": { name: { step: round(seconds, 4) for step, seconds in steps.items() } for name, steps in self.objects.items() },
+            "outputs": { os.path.relpath(f, directory).replace(os.sep, "/"): os.path.getsize(f) for f in outputs if os.path.exists(f) },
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+        return data
+
+
+# ------------------------------------------- WATCH MODE
+# depsgraph updates -> debounced incremental export -> reload of the preview pages
+WATCH_DEBOUNCE = 0.5
+
+class Watcher:
+    active = False
+    pending = set()
+    check_all = False
+    deadline = 0.0
+    # object name -> hash after the last export: changes made by the export itself are not seen as edits
+    snapshot = {}
+    # names of the changed objects during a watch export (the others keep their manifest hash), None: every object
+    scope = None
+
+def watch_hash(obj, scene, image_digests):
+    h = object_hash(obj, scene, image_digests)
+    if obj.type != 'MESH' and obj.data is not None:
+        # lights, cameras: their settings are in the page
+        h += _rna_signature(obj.data)
+    return h
+
+def watch_snapshot(scene):
+    image_digests = {}
+    return { obj.name: watch_hash(obj, scene, image_digests) for obj in bpy.data.objects }
+
+def watch_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        data = update.id.original
+        if isinstance(data, bpy.types.Object):
+            Watcher.pending.add(data.name)
+        elif isinstance(data, (bpy.types.Mesh, bpy.types.Material, bpy.types.Image, bpy.types.NodeTree, bpy.types.Light, bpy.types.Action)):
+            # shared data: every object may have changed
+            Watcher.check_all = True
+    if Watcher.pending or Watcher.check_all:
+        Watcher.deadline = time.monotonic() + WATCH_DEBOUNCE
+        if not bpy.app.timers.is_registered(watch_timer):
+            bpy.app.timers.register(watch_timer, first_interval=WATCH_DEBOUNCE)
+
+def watch_timer():
+    remaining = Watcher.deadline - time.monotonic()
+    if remaining > 0:
+        return remaining
+    scene = bpy.context.scene
+    names = Watcher.pending
+    if Watcher.check_all:
+        names = set(Watcher.snapshot) | set(obj.name for obj in bpy.data.objects)
+    Watcher.pending = set()
+    Watcher.check_all = False
+    image_digests = {}
+    changed = []
+    for name in names:
+        obj = bpy.data.objects.get(name)
+        digest = watch_hash(obj, scene, image_digests) if obj else None
+        if digest != Watcher.snapshot.get(name):
+            changed.append(name)
+    if changed:
+        print("[WATCH] changed: "+", ".join(sorted(changed)))
+        watch_export(scene, set(changed))
+    return None
+
+def watch_export(scene, changed):
+    # incremental export whatever the scene setting, only the changed objects (None: all) are hashed and exported again
+    window = bpy.context.window_manager.windows[0]
+    incremental = scene.b_incremental_export
+    scene.b_incremental_export = True
+    Watcher.scope = changed
+    try:
+        with bpy.context.temp_override(window=window):
+            bpy.ops.aframe.export()
+    finally:
+        Watcher.scope = None
+        scene.b_incremental_export = incremental
+    if changed is None:
+        Watcher.snapshot = watch_snapshot(scene)
+        return
+    image_digests = {}
+    for name in changed:
+        obj = bpy.data.objects.get(name)
+        if obj:
+            Watcher.snapshot[name] = watch_hash(obj, scene, image_digests)
+        else:
+            Watcher.snapshot.pop(name, None)
+
+def start_watch(scene):
+    Watcher.active = True
+    watch_export(scene, None)
+    bpy.app.handlers.depsgraph_update_post.append(watch_depsgraph_update)
+
+def stop_watch():
+    Watcher.active = False
+    if watch_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(watch_depsgraph_update)
+    if bpy.app.timers.is_registered(watch_timer):
+        bpy.app.timers.unregister(watch_timer)
+    Watcher.pending = set()
+    Watcher.snapshot = {}
 
 
 # Index html a-frame template
@@ -166,7 +2095,7 @@ def default_template():
         <link rel="stylesheet" type="text/css" href="style.css">
     </head>
     <body onload="init();">
-        <a-scene ${stats} ${joystick} ${render_shadows} ${renderer}>
+        <a-scene ${stats} ${joystick} ${render_shadows} ${renderer} ${draco_decoder}>
             <!-- Assets -->
             <a-assets>${asset}
                 <img id="sky"                 src="./resources/sky.jpg">
@@ -339,6 +2268,50 @@ class AframeExportPanel_PT_Panel(bpy.types.Panel):
             box.prop(scene, "s_project_name")
             box.prop(scene, "export_path")
             box.prop(scene, "b_export_single_model")
+            box.prop(scene, "s_export_format")
+            box.prop(scene, "s_compression")
+            if scene.s_compression != 'NONE':
+                box.prop(scene, "s_draco_decoder_path")
+            box.prop(scene, "b_texture_store")
+            if scene.b_texture_store:
+                box.prop(scene, "s_texture_profile")
+                box.prop(scene, "b_texture_pot")
+                box.prop(scene, "s_texture_format")
+                box.prop(scene, "i_texture_quality")
+            box.prop(scene, "b_lod")
+            if scene.b_lod:
+                box.prop(scene, "s_lod_ratios")
+                box.prop(scene, "s_lod_distances")
+            box.prop(scene, "b_streaming")
+            if scene.b_streaming:
+                box.prop(scene, "f_cell_size")
+                box.prop(scene, "f_load_radius")
+            box.prop(scene, "s_lightmap_format")
+            if scene.s_lightmap_format != 'PNG':
+                box.prop(scene, "i_lightmap_quality")
+            box.prop(scene, "b_lightmap_atlas")
+            if scene.b_lightmap_atlas:
+                box.prop(scene, "i_atlas_size")
+            row = box.row(align=True)
+            row.operator('aframe.savelm', text='Save Lightmaps')
+            row.operator('aframe.loadlm', text='Load Lightmaps')
+            box.prop(scene, "b_lazy_video")
+            if scene.b_lazy_video:
+                box.prop(scene, "f_video_distance")
+            box.prop(scene, "s_image_profile")
+            box.prop(scene, "b_image_atlas")
+            box.prop(scene, "b_static_batching")
+            if scene.b_static_batching:
+                box.prop(scene, "b_batch_by_cell")
+            box.prop(scene, "b_precompress")
+            box.prop(scene, "b_incremental_export")
+            if scene.b_incremental_export:
+                box.prop(scene, "b_force_rebuild")
+            box.prop(scene, "s_asset_cache")
+            box.prop(scene, "b_fast_writer")
+            box.prop(scene, "b_parallel_export")
+            if scene.b_parallel_export:
+                box.prop(scene, "i_export_workers")
             box.operator('aframe.clear_asset_dir', text='Clear Assets Directory')
         
         # Show properties of selected object
@@ -364,11 +2337,16 @@ class AframeExportPanel_PT_Panel(bpy.types.Panel):
         row = layout.row(align=True) 
         row.operator('aframe.export', text='Export A-Frame Project')
         row = layout.row(align=True) 
+        row.prop(scene, "s_server_address")
+        row.prop(scene, "i_server_port")
+        row = layout.row(align=True) 
         serve_label = "Stop Serving" if Server.instance else "Start Serving"
         row.operator('aframe.serve', text=serve_label)
+        watch_label = "Stop Watching" if Watcher.active else "Start Watching"
+        row.operator('aframe.watch', text=watch_label)
         row = layout.row(align=True) 
         if Server.instance:
-            row.operator("wm.url_open", text="Open Preview").url = f'http://localhost:{PORT}'
+            row.operator("wm.url_open", text="Open Preview").url = Server.instance.url()
             row = layout.row(align=True) 
         row.label(text=scene.s_output, icon='INFO')
         
@@ -470,22 +2448,34 @@ class AframeSavelm_OT_Operator(bpy.types.Operator):
     bl_description = "Save Lightmaps"
     
     def execute(self, content):
-        images = bpy.data.images
         scene = content.scene
-        original_format = scene.render.image_settings.file_format
-        settings = scene.render.image_settings
-        settings.file_format = 'PNG'
         DEST_RES = os.path.join ( scene.export_path, scene.s_project_name )
+        directory = os.path.join ( DEST_RES, PATH_LIGHTMAPS )
+        os.makedirs ( directory, exist_ok=True )
+        # baked images, not the lightmap files loaded back from the lightmaps directory
+        images = [ img for img in bpy.data.images if "_baked" in img.name and img.has_data and os.path.dirname(os.path.normpath(bpy.path.abspath(img.filepath))) != os.path.normpath(directory) ]
+        cache = load_lightmap_cache(directory)
+        saved = cache.setdefault("saved", {})
+        ext = LIGHTMAP_FORMATS[scene.s_lightmap_format]
+        digests = pixel_digests(images, os.cpu_count() or 1)
+        written = 0
         for img in images:
-            if "_baked" in img.name and img.has_data:
-                ext = ".png"
-                #ext = "."+img.file_format
-                #img.filepath = image_dir_path+img.name+ext         
-                #print( os.path.join ( DEST_RES, PATH_LIGHTMAPS, img.name+ext ) )      
-                img.file_format = 'PNG'
-                img.save_render(os.path.join ( DEST_RES, PATH_LIGHTMAPS, img.name+ext ) )
-                print("[SAVE LIGHTMAPS] Save image "+img.name)
-        settings.file_format = original_format
+            filename = img.name+ext
+            path = os.path.join ( directory, filename )
+            # pixels and output settings: an unchanged lightmap is not saved again
+            digest = digests[img.name]+":"+scene.s_lightmap_format+":"+str(scene.i_lightmap_quality)
+            entry = saved.get(img.name)
+            if entry and entry["hash"] == digest and entry["file"] == filename and entry["stat"] == file_signature(path):
+                continue
+            save_image(img, path, scene.s_lightmap_format, scene.i_lightmap_quality, False, scene, False)
+            if entry and entry["file"] != filename and os.path.exists(os.path.join ( directory, entry["file"] )):
+                # saved before with another format
+                os.remove(os.path.join ( directory, entry["file"] ))
+            saved[img.name] = { "hash": digest, "file": filename, "stat": file_signature(path) }
+            written += 1
+            print("[SAVE LIGHTMAPS] Save image "+img.name)
+        save_lightmap_cache(directory, cache)
+        print("[SAVE LIGHTMAPS] "+str(written)+" saved, "+str(len(images)-written)+" unchanged")
         return {'FINISHED'}
     
 class AframeLoadlm_OT_Operator(bpy.types.Operator):
@@ -496,16 +2486,44 @@ class AframeLoadlm_OT_Operator(bpy.types.Operator):
     def execute(self, content):
         scene = content.scene
         DEST_RES = os.path.join ( scene.export_path, scene.s_project_name )
-        
-        # delete all _baked textures
-        images = bpy.data.images
-        for img in images:
+        directory = os.path.join ( DEST_RES, PATH_LIGHTMAPS )
+        if not os.path.isdir(directory):
+            self.report({'ERROR'}, "No lightmaps directory: "+directory+" (save the lightmaps first)")
+            return {'CANCELLED'}
+        cache = load_lightmap_cache(directory)
+        loaded = cache.setdefault("loaded", {})
+        saved = cache.get("saved", {})
+        files = lightmap_index([ file for file in os.listdir(directory) if not file.startswith(ATLAS_PREFIX) ])
+        for stem in files:
+            # the last saved format wins over older files of the same lightmap
+            if stem in saved and os.path.exists(os.path.join ( directory, saved[stem]["file"] )):
+                files[stem] = saved[stem]["file"]
+        paths = { os.path.normpath(os.path.join ( directory, file )): file for file in files.values() }
+
+        # delete the _baked textures not loaded from a lightmap file, keep the loaded ones
+        images = {}
+        for img in list(bpy.data.images):
             if "_baked" in img.name:
-                print("delete: "+img.name)
-                bpy.data.images.remove(img)
-                
-        for filename in os.listdir(os.path.join ( DEST_RES, PATH_LIGHTMAPS)):
-            bpy.data.images.load(os.path.join ( DEST_RES, PATH_LIGHTMAPS) + filename)
+                path = os.path.normpath(bpy.path.abspath(img.filepath)) if img.filepath else ""
+                if path in paths:
+                    images[path] = img
+                else:
+                    print("delete: "+img.name)
+                    bpy.data.images.remove(img)
+
+        # only new or modified files (mtime and size, then content hash) are read again
+        changed = [ path for path, file in paths.items() if path not in images or file not in loaded or loaded[file]["stat"] != file_signature(path) ]
+        digests = file_digests(changed, os.cpu_count() or 1)
+        for path in changed:
+            file = paths[path]
+            if path not in images:
+                bpy.data.images.load(path)
+            elif file not in loaded or loaded[file]["hash"] != digests[path]:
+                images[path].reload()
+            loaded[file] = { "hash": digests[path], "stat": file_signature(path) }
+        cache["loaded"] = { file: entry for file, entry in loaded.items() if file in paths.values() }
+        save_lightmap_cache(directory, cache)
+        print("[LOAD LIGHTMAPS] "+str(len(changed))+" loaded, "+str(len(paths)-len(changed))+" unchanged")
         return {'FINISHED'}    
         
 class AframeServe_OT_Operator(bpy.types.Operator):
@@ -519,12 +2537,30 @@ class AframeServe_OT_Operator(bpy.types.Operator):
             Server.instance = None
             return {'FINISHED'}
         scene = content.scene
-        Server.instance = Server()
+        Server.instance = Server(daemon=True)
         Server.instance.set_folder(os.path.join ( scene.export_path, scene.s_project_name ))
+        try:
+            Server.instance.bind(scene.s_server_address, scene.i_server_port)
+        except OSError as e:
+            Server.instance = None
+            self.report({'ERROR'}, "Cannot serve on "+scene.s_server_address+":"+str(scene.i_server_port)+": "+str(e))
+            return {'CANCELLED'}
         Server.instance.start()
         
         return {'FINISHED'}
 
+class AframeWatch_OT_Operator(bpy.types.Operator):
+    bl_idname = "aframe.watch"
+    bl_label = "Watch and Export"
+    bl_description = "Export again (incremental) every time the scene changes and reload the preview pages"
+
+    def execute(self, content):
+        if Watcher.active:
+            stop_watch()
+            return {'FINISHED'}
+        start_watch(content.scene)
+        return {'FINISHED'}
+
 class AframeExport_OT_Operator(bpy.types.Operator):
     bl_idname = "aframe.export"
     bl_label = "Export to Aframe Project"
@@ -534,9 +2570,12 @@ class AframeExport_OT_Operator(bpy.types.Operator):
         assets = []
         entities = []
         lights = []
+        report = []
         print("[AFRAME EXPORTER] Starting Exporting Project.....................................")
         scene = content.scene
         scene.s_output = "exporting..."
+        profile = ExportProfile()
+        profile.phase("setup")
         script_file = os.path.realpath(__file__)
         #print("script_file dir = "+script_file)
         directory = os.path.dirname(script_file)
@@ -558,11 +2597,12 @@ class AframeExport_OT_Operator(bpy.types.Operator):
             print ( "--- DEST [%s] [%s] {%s}" % ( DEST_RES, dp, p ) )
             os.makedirs ( dp, exist_ok=True )
 
+        profile.phase("resources")
         #check if addon or script for correct path
         _resources = [
             [ ".", "favicon.ico", True ],
             [ ".", "style.css" , True],
-            [ ".", "start_web_server.py" , False],
+            [ ".", "start_web_server.py" , True],
             [ PATH_RESOURCES, "sky.jpg", False ],
             [ PATH_RESOURCES, "play.png", False ],
             [ PATH_RESOURCES, "pause.png", False],
@@ -584,12 +2624,8 @@ class AframeExport_OT_Operator(bpy.types.Operator):
         ]
 
         SRC_RES = os.path.join ( directory, PATH_RESOURCES )
-        for dest_path, fname, overwrite in _resources:
-            if overwrite:
-                shutil.copyfile ( os.path.join ( SRC_RES, fname ), os.path.join ( DEST_RES, dest_path, fname ) )
-            else:
-                if not os.path.exists(os.path.join ( DEST_RES, dest_path, fname )):
-                    shutil.copyfile ( os.path.join ( SRC_RES, fname ), os.path.join ( DEST_RES, dest_path, fname ) )                    
+        sync_stats = new_sync_stats()
+        sync_resources(SRC_RES, DEST_RES, _resources, sync_stats)
 
         # Loop 3D entities
         exclusion_obj_types = ['CAMERA','LAMP','ARMATURE']
@@ -597,144 +2633,372 @@ class AframeExport_OT_Operator(bpy.types.Operator):
         videocount=0
         imagecount=0
         scalefactor = 2
-        lightmap_files = os.listdir(os.path.join ( DEST_RES, PATH_LIGHTMAPS))
+        profile.phase("lightmaps")
+        lightmap_files = [ file for file in os.listdir(os.path.join ( DEST_RES, PATH_LIGHTMAPS)) if not file.startswith(ATLAS_PREFIX) ]
         for file in lightmap_files:
             print("[LIGHTMAP] Found Lightmap file: "+file)
+        lightmaps = lightmap_index(lightmap_files)
+        lightmap_atlases = {}
+        if scene.b_lightmap_atlas and not scene.b_export_single_model:
+            lightmap_atlases = build_lightmap_atlases(os.path.join ( DEST_RES, PATH_LIGHTMAPS ), lightmaps, scene.i_atlas_size, report)
 
-        # ONE SINGLE MESH
-        # Note: with a single mesh you can't add interactions
-        if scene.b_export_single_model:
-            print("[AFRAME EXPORTER] Exporting one single global mesh")
-            if scene.b_cast_shadows:
-                single_cast_shadows = "true"
-            else:                     
-                single_cast_shadows = "false"
-            entities.append('\n\t\t\t<a-entity id="#MainMesh" gltf-model="#MainMesh" scale="1 1 1" visible="true" shadow="cast: '+single_cast_shadows+'"></a-entity>')
-            assets.append('\n\t\t\t\t<a-asset-item id="MainMesh" src="./assets/MainMesh.gltf'+'"></a-asset-item>')
-            bpy.ops.object.select_all(action='SELECT')
-            filename = os.path.join ( DEST_RES, PATH_ASSETS, "MainMesh" ) # + '.glft' )
-#            bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True)
-#            obj.select_set(state=True)
-            bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True, export_texcoords = True, export_normals = True, export_draco_mesh_compression_enable = False, export_draco_mesh_compression_level = 6, export_draco_position_quantization = 14, export_draco_normal_quantization = 10, export_draco_texcoord_quantization = 12, export_draco_generic_quantization = 12,export_tangents = True, export_materials = 'EXPORT', export_colors = True, export_extras = True, export_yup = True, export_apply = True, export_animations = True, export_frame_range = True, export_frame_step = 1, export_force_sampling = True)
-            bpy.ops.object.select_all(action='DESELECT')
-        else:
-            # MULTI MESH EXPORTING
-            for obj in bpy.data.objects:
-                if obj.type not in exclusion_obj_types:
-                    print("[AFRAME EXPORTER] loop object "+ obj.name)
-                    bpy.ops.object.select_all(action='DESELECT')
-                    obj.select_set(state=True)
-                    bpy.context.view_layer.objects.active = obj
-                    #bpy.ops.object.origin_set(type='ORIGIN_CENTER_OF_MASS', center='BOUNDS')
-                    bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY')
-                    location = obj.location.copy()
-                    rotation = obj.rotation_euler.copy()
+        profile.phase("objects")
+        # Incremental export: objects whose hash matches the manifest are not exported again
+        assets_dir = os.path.join ( DEST_RES, PATH_ASSETS )
+        manifest_path = os.path.join ( assets_dir, PATH_MANIFEST )
+        manifest = {}
+        new_manifest = {}
+        image_digests = {}
+        cache_hits = 0
+        cache_misses = 0
+        parallel_jobs = []
+        written_assets = []
+        produced_assets = []
+        image_swaps = []
+        swap_files = []
+        # asset cache shared between projects (batch exports), unused with a single model
+        asset_cache = bpy.path.abspath(scene.s_asset_cache) if scene.s_asset_cache and not scene.b_export_single_model else ""
+        shared_hits = 0
+        cache_stores = []
+        draco_used = scene.s_compression != 'NONE'
+        if scene.b_incremental_export:
+            if not scene.b_force_rebuild:
+                manifest = load_manifest(manifest_path)
+        elif os.path.exists(manifest_path):
+            # a full export makes the stored hashes meaningless
+            os.remove(manifest_path)
+
+        # the user selection is restored after the exports (even failed ones), the loop selects one object at a time
+        selection = deselect_objects(bpy.context.view_layer)
+
+        try:
+            # ONE SINGLE MESH
+            # Note: with a single mesh you can't add interactions
+            if scene.b_export_single_model:
+                print("[AFRAME EXPORTER] Exporting one single global mesh")
+                if scene.b_cast_shadows:
+                    single_cast_shadows = "true"
+                else:                     
+                    single_cast_shadows = "false"
+                entities.append(SceneNode('entity', "a-entity", ( ("id", "#MainMesh"), ("gltf-model", "#MainMesh"), ("scale", "1 1 1"), ("visible", "true"), ("shadow", "cast: "+single_cast_shadows) )))
+                assets.append(SceneNode('asset', "a-asset-item", ( ("id", "MainMesh"), ("src", "./assets/MainMesh"+asset_extension(scene)) ), 4))
+                bpy.ops.object.select_all(action='SELECT')
+                filename = os.path.join ( DEST_RES, PATH_ASSETS, "MainMesh" ) # + '.glft' )
+    #            bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True)
+    #            obj.select_set(state=True)
+                started = time.perf_counter()
+                export_gltf(filename, scene)
+                profile.add("MainMesh", "gltf_export", started)
+                written_assets.append(filename)
+                produced_assets.append("MainMesh")
+                bpy.ops.object.select_all(action='DESELECT')
+            else:
+                # MULTI MESH EXPORTING
+                cells = {}
+                cell_size = max(scene.f_cell_size, 1.0)
+                # static batching: non interactive meshes with the same materials are merged in batch objects exported by the loop
+                batched = set()
+                batches = []
+                # the batch objects are removed from the blend file even when the export fails
+                try:
+                    if scene.b_static_batching:
+                        profile.phase("batching")
+                        candidates = [ obj for obj in bpy.data.objects if obj.type not in exclusion_obj_types ]
+                        calls_before = draw_calls(candidates)
+                        for group in batch_groups(candidates, lightmaps, cell_size if scene.b_batch_by_cell else None):
+                            batches.append(build_batch(BATCH_PREFIX+str(len(batches)+1), group, scene))
+                            batched.update(obj.name for obj in group)
+                        calls_after = draw_calls([ obj for obj in candidates if obj.name not in batched ] + batches)
+                        report.append("[BATCHING] "+str(len(batched))+" objects merged in "+str(len(batches))+" batches, draw calls: "+str(calls_before)+" -> "+str(calls_after))
+                        profile.phase("objects")
+                    # linked duplicates are exported once, each instance keeps its transform in the entity
+                    shared_assets = shared_mesh_assets([ obj for obj in bpy.data.objects if obj.name not in batched ])
+                    exported_assets = set()
+                    asset_lods = {}
+                    writer_counts = { True: 0, False: 0 }
+                    for obj in bpy.data.objects:
+                        if obj.type not in exclusion_obj_types and obj.name not in batched:
+                            print("[AFRAME EXPORTER] loop object "+ obj.name)
+                            asset_name = shared_assets.get(obj.name, obj.name)
+                            # the model is exported around its bounds centre, the entity is placed there (read from the matrices, no operator)
+                            center = bounds_center(obj)
+                            cell_position = center
+                            rotation = obj.rotation_euler.copy()
                     
-                    bpy.ops.object.location_clear()
-                    actualposition = str(location.x)+" "+str(location.z)+" "+str(-location.y)
-                    actualscale = str(scalefactor*bpy.data.objects[obj.name].scale.x)+" "+str(scalefactor*bpy.data.objects[obj.name].scale.y)+" "+str(scalefactor*bpy.data.objects[obj.name].scale.z)
-                    #pi = 22.0/7.0
-                    #actualrotation = str(((bpy.data.objects[obj.name].rotation_euler.x) / (2 * pi) * 360) - 90) +" " + str(((bpy.data.objects[obj.name].rotation_euler.z) / (2 * pi) * 360)-0) + " " + str(((bpy.data.objects[obj.name].rotation_euler.y) / (2 * pi) * 360)+90)
-                    #actualrotation = str(bpy.data.objects[obj.name].rotation_euler.x) +" " + str(bpy.data.objects[obj.name].rotation_euler.z)+ " " + str(bpy.data.objects[obj.name].rotation_euler.y)
-                    #actualrotation = str(math.degrees(-89.99+bpy.data.objects[obj.name].rotation_euler.x)) +" " + str(90+math.degrees(bpy.data.objects[obj.name].rotation_euler.y))+ " " + str(-90+math.degrees(bpy.data.objects[obj.name].rotation_euler.z))
-                    #actualrotation = str(math.degrees(rotation.x))+" "+str(math.degrees(rotation.z))+" "+str(math.degrees(-rotation.y))    
-                    actualrotation = "0 "+str(math.degrees(rotation.z))+" 0"    
+                            actualposition = str(center.x)+" "+str(center.z)+" "+str(-center.y)
+                            if asset_name == obj.name:
+                                actualtransform = ( ("scale", "1 1 1"), ("position", actualposition) )
+                            else:
+                                shared_position, shared_rotation, shared_scale = aframe_transform(obj.matrix_world)
+                                actualtransform = ( ("scale", shared_scale), ("position", shared_position), ("rotation", shared_rotation) )
+                            actualscale = str(scalefactor*bpy.data.objects[obj.name].scale.x)+" "+str(scalefactor*bpy.data.objects[obj.name].scale.y)+" "+str(scalefactor*bpy.data.objects[obj.name].scale.z)
+                            #pi = 22.0/7.0
+                            #actualrotation = str(((bpy.data.objects[obj.name].rotation_euler.x) / (2 * pi) * 360) - 90) +" " + str(((bpy.data.objects[obj.name].rotation_euler.z) / (2 * pi) * 360)-0) + " " + str(((bpy.data.objects[obj.name].rotation_euler.y) / (2 * pi) * 360)+90)
+                            #actualrotation = str(bpy.data.objects[obj.name].rotation_euler.x) +" " + str(bpy.data.objects[obj.name].rotation_euler.z)+ " " + str(bpy.data.objects[obj.name].rotation_euler.y)
+                            #actualrotation = str(math.degrees(-89.99+bpy.data.objects[obj.name].rotation_euler.x)) +" " + str(90+math.degrees(bpy.data.objects[obj.name].rotation_euler.y))+ " " + str(-90+math.degrees(bpy.data.objects[obj.name].rotation_euler.z))
+                            #actualrotation = str(math.degrees(rotation.x))+" "+str(math.degrees(rotation.z))+" "+str(math.degrees(-rotation.y))    
+                            actualrotation = "0 "+str(math.degrees(rotation.z))+" 0"    
                         
-                    # custom aframe code read from CUSTOM PROPERTIES
-                    reflections = ""
-                    animation = ""
-                    link = ""
-                    baked = ""
-                    custom = ""
-                    toggle = ""
-                    video = False
-                    image = False
-                    tag = "entity"
-                    gltf_model = 'gltf-model="#'+obj.name+'"' 
-
-                    # export gltf
-                    # print(obj.type)
-                    if obj.type == 'MESH' or obj.type == 'EMPTY':
-                        if obj.type == 'EMPTY':
-                            gltf_model = ''
-                        #print(obj.name,"custom properties:\n********************")                        
-                        for K in obj.keys():
-                            #print(K , "-" , obj[K], "\n" )
-                            #print(K , "=" , obj[K])
-                            if K not in '_RNA_UI':
-                                #print( "\n", K , "-" , obj[K], "\n" )
-                                if K == "AFRAME_CUBEMAP" and scene.b_cubemap:
-                                    if scene.b_camera_cube:
-                                        reflections = ' geometry="" camera-cube-env="distance: 500; resolution: 512; repeat: true; interval: 400" '
-                                    else:
-                                        reflections = ' geometry="" cube-env-map="path: '+scene.s_cubemap_path+'; extension: '+scene.s_cubemap_ext+'; reflectivity: 0.99;" '
-                                elif K == "AFRAME_ANIMATION":
-                                    animation = ' animation= "'+obj[K]+'" '
-                                elif K == "AFRAME_HTTP_LINK":
-                                    #link = ' link="href: '+obj[K]+'" class="clickable" '
-                                    link = ' link-handler="target: '+obj[K]+'" class="clickable" '
-                                elif K == "AFRAME_VIDEO":
-                                    #print("--------------- pos " + actualposition)
-                                    #print("--------------- rot " + actualrotation)
-                                    #print("--------------- scale " + actualscale)                                
-                                    #filename = os.path.join ( DEST_RES, PATH_ASSETS, obj.name ) # + '.glft' )
-                                    #bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True)
-                                    #assets.append('\n\t\t\t\t<a-asset-item id="'+obj.name+'" src="./assets/'+obj.name + '.gltf'+'"></a-asset-item>')                                
-                                    assets.append('\n\t\t\t\t<video id="video_'+str(videocount)+'" loop="true" autoplay="true" src="./media/'+obj[K]+'"></video>')
-                                    entities.append('\n\t\t\t<a-video id="#v_'+str(videocount)+'" src="#video_'+str(videocount)+'" width="1" height="1" scale="'+actualscale+'" position="'+actualposition+'" rotation="'+actualrotation+'" visible="true" shadow="cast: false" '+animation+link+'></a-video>')
-                                    #entities.append('\n\t\t\t<a-video id="#v_'+str(videocount)+'" src="#video_'+str(videocount)+'" width="'+str(bpy.data.objects[obj.name].scale.x)+'" height="'+str(bpy.data.objects[obj.name].scale.y)+'" scale="1 1 1" position="'+actualposition+'" rotation="'+actualrotation+'" visible="true" shadow="cast: false" '+animation+link+'></a-video>')
+                            # custom aframe code read from CUSTOM PROPERTIES, as (attribute, value) pairs
+                            reflections = ()
+                            animation = ()
+                            link = ()
+                            baked = ()
+                            custom = ()
+                            toggle = ()
+                            clickable = False
+                            video = False
+                            image = False
+                            tag = "entity"
+                            gltf_model = ( ("gltf-model", "#"+asset_name), )
+
+                            # export gltf
+                            # print(obj.type)
+                            if obj.type == 'MESH' or obj.type == 'EMPTY':
+                                if obj.type == 'EMPTY':
+                                    gltf_model = ()
+                                #print(obj.name,"custom properties:\n********************")                        
+                                for K in obj.keys():
+                                    #print(K , "-" , obj[K], "\n" )
+                                    #print(K , "=" , obj[K])
+                                    if K not in '_RNA_UI':
+                                        #print( "\n", K , "-" , obj[K], "\n" )
+                                        if K == "AFRAME_CUBEMAP" and scene.b_cubemap:
+                                            if scene.b_camera_cube:
+                                                reflections = ( ("geometry", ""), ("camera-cube-env", "distance: 500; resolution: 512; repeat: true; interval: 400") )
+                                            else:
+                                                reflections = ( ("geometry", ""), ("cube-env-map", "path: "+scene.s_cubemap_path+"; extension: "+scene.s_cubemap_ext+"; reflectivity: 0.99;") )
+                                        elif K == "AFRAME_ANIMATION":
+                                            animation = ( ("animation", obj[K]), )
+                                        elif K == "AFRAME_HTTP_LINK":
+                                            #link = ' link="href: '+obj[K]+'" class="clickable" '
+                                            link = ( ("link-handler", "target: "+obj[K]), )
+                                            clickable = True
+                                        elif K == "AFRAME_VIDEO":
+                                            video = True
+                                        elif K == "AFRAME_IMAGES":
+                                            #print(".....images")
+                                            image = True
+                                            imagecount = imagecount +1
+                                            #json_images = '{"1": "image1.jpg", "2": "image2.jpg"}'
+                                            json_images = obj[K]
+                                            json_dictionary = json.loads(json_images)
+                                            # assets and a-image entities are written by image_swap_nodes after the loop
+                                            image_swaps.append(( ( ("id", "#i_"+str(imagecount)), ("class", "clickable"), ("width", "1"), ("height", "1"), ("scale", actualscale), ("position", actualposition), ("rotation", actualrotation), ("visible", "true"), ("shadow", "cast: false") ), [ str(json_dictionary[key]) for key in json_dictionary ] ))
+                                        elif K == "AFRAME_SHOW_HIDE_OBJECT":
+                                            toggle = ( ("toggle-handler", "target: #"+obj[K]+";"), )
+                                            clickable = True
+                                        elif K == "AFRAME_TAG":
+                                            tag = obj[K]
+                                        elif K == "AFRAME_NOGLTF":
+                                            gltf_model = ()
+                                        elif K in (AFRAME_COMPRESSION, AFRAME_LOD, AFRAME_VIDEO_AUTOPLAY, AFRAME_VIDEO_STREAM):
+                                            pass # export settings, see compression_profile(), lod_ratios() and the video entity
+                                        elif K.startswith('AFRAME_'):
+                                            attr   = K.split("AFRAME_")[1].lower()
+                                            custom = custom + ( (attr, str(obj[K])), )
+                                #print("********************")
+                                classes = ( ("class", "clickable"), ) if clickable else ()
+
+                                if video:
                                     #entities.append('\n\t\t\t<a-entity id="#'+obj.name+'" gltf-model="#'+obj.name+'" material="src: #video_'+str(videocount)+'" scale="'+actualscale+'" rotation="'+actualrotation+'" position="'+actualposition+'"></a-entity>')
-                                    video = True
+                                    autoplay = str(obj.get(AFRAME_VIDEO_AUTOPLAY, True)).lower() not in ("false", "0")
+                                    video_src = "./media/"+obj["AFRAME_VIDEO"]
+                                    if str(obj.get(AFRAME_VIDEO_STREAM, False)).lower() in ("true", "1") or (scene.b_lazy_video and not autoplay):
+                                        # not in a-assets: the page does not wait for it, lazy-video loads it on click or proximity
+                                        video_source = ( ("lazy-video", "src: "+video_src+"; distance: "+str(scene.f_video_distance)+"; autoplay: "+str(autoplay).lower()), )
+                                        if not classes:
+                                            classes = ( ("class", "clickable"), )
+                                    else:
+                                        assets.append(SceneNode('asset', "video", ( ("id", "video_"+str(videocount)), ("loop", "true") ) + ( ( ("autoplay", "true"), ) if autoplay else () ) + ( ("src", video_src), ), 4))
+                                        video_source = ( ("src", "#video_"+str(videocount)), )
+                                    entities.append(SceneNode('entity', "a-video", ( ("id", "#v_"+str(videocount)), ) + video_source + ( ("width", "1"), ("height", "1"), ("scale", actualscale), ("position", actualposition), ("rotation", actualrotation), ("visible", "true"), ("shadow", "cast: false") ) + animation + link + classes))
                                     videocount = videocount +1
-                                elif K == "AFRAME_IMAGES":
-                                    #print(".....images")
-                                    image = True
-                                    imagecount = imagecount +1
-                                    #load K
-                                    #json_images = '{"1": "image1.jpg", "2": "image2.jpg"}'
-                                    json_images = obj[K]
-                                    json_dictionary = json.loads(json_images)
-                                    for key in json_dictionary:
-                                        #print(key, ":", json_dictionary[key])
-                                        assets.append('\n\t\t\t\t<img id="image_'+key+'" src="./media/'+json_dictionary[key]+'"></img>')
-                                    entities.append('\n\t\t\t<a-image images-handler id="#i_'+str(imagecount)+'" src="#image_'+key+'" class="clickable" width="1" height="1" scale="'+actualscale+'" position="'+actualposition+'" rotation="'+actualrotation+'" visible="true" shadow="cast: false"></a-image>')
-                                elif K == "AFRAME_SHOW_HIDE_OBJECT":
-                                    toggle = ' toggle-handler="target: #'+obj[K]+';" class="clickable" '
-                                elif K == "AFRAME_TAG":
-                                    tag = obj[K]
-                                elif K == "AFRAME_NOGLTF":
-                                    gltf_model = ""
-                                elif K.startswith('AFRAME_'):
-                                    attr   = K.split("AFRAME_")[1].lower()
-                                    custom = custom+' '+attr+'="'+str(obj[K])+'"'
-                        #print("********************")
-
-                        if video == False and image == False:                        
-                            # check if baked texture is present on filesystem
-                            #images = bpy.data.images
-                            #for img in images:
-                            #    if obj.name+"_baked" in img.name and img.has_data:
-                            #       print("ok")
-                            #       baked = 'light-map-geometry="path: lightmaps/'+img.name+'"'
-                            print("[LIGHTMAP] Searching Lightmap for object ["+obj.name+"_baked"+"]")                        
-                            for file in lightmap_files:
-                                if obj.name+"_baked" in file:
-                                    print("[LIGHTMAP] Found lightmap: "+file)
-                                    baked = 'light-map-geometry="path: lightmaps/'+file+'; intensity: '+str(scene.f_lightMapIntensity)+'"'
+                                elif image == False:
+                                    # check if baked texture is present on filesystem
+                                    #images = bpy.data.images
+                                    #for img in images:
+                                    #    if obj.name+"_baked" in img.name and img.has_data:
+                                    #       print("ok")
+                                    #       baked = 'light-map-geometry="path: lightmaps/'+img.name+'"'
+                                    stem = obj.name+LIGHTMAP_SUFFIX
+                                    if stem in lightmap_atlases:
+                                        file, offset, repeat = lightmap_atlases[stem]
+                                        print("[LIGHTMAP] Found lightmap: "+lightmaps[stem]+" in "+file)
+                                        baked = ( ("light-map-geometry", "path: lightmaps/"+file+"; intensity: "+str(scene.f_lightMapIntensity)+"; offset: "+offset+"; repeat: "+repeat), )
+                                    elif stem in lightmaps:
+                                        print("[LIGHTMAP] Found lightmap: "+lightmaps[stem])
+                                        baked = ( ("light-map-geometry", "path: lightmaps/"+lightmaps[stem]+"; intensity: "+str(scene.f_lightMapIntensity)), )
                                 
-                            filename = os.path.join ( DEST_RES, PATH_ASSETS, obj.name ) # + '.glft' )
-                            #bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True)
-                            bpy.ops.export_scene.gltf(filepath=filename, export_format='GLTF_EMBEDDED', use_selection=True, export_texcoords = True, export_normals = True, export_draco_mesh_compression_enable = False, export_draco_mesh_compression_level = 6, export_draco_position_quantization = 14, export_draco_normal_quantization = 10, export_draco_texcoord_quantization = 12, export_draco_generic_quantization = 12,export_tangents = True, export_materials = 'EXPORT', export_colors = True, export_extras = True, export_yup = True, export_apply = True, export_animations = True, export_frame_range = True, export_frame_step = 1, export_force_sampling = True)
-                            assets.append('\n\t\t\t\t<a-asset-item id="'+obj.name+'" src="./assets/'+obj.name + '.gltf'+'"></a-asset-item>')
-                            if scene.b_cast_shadows:
-                                entities.append('\n\t\t\t<a-'+tag+' id="#'+obj.name+'" '+gltf_model+' scale="1 1 1" position="'+actualposition+'" visible="true" shadow="cast: true" '+reflections+animation+link+custom+toggle+'></a-'+tag+'>')
-                            else:
-                                entities.append('\n\t\t\t<a-'+tag+' id="#'+obj.name+'" '+gltf_model+' '+baked+' scale="1 1 1" position="'+actualposition+'" visible="true" shadow="cast: false" '+reflections+animation+link+custom+toggle+'></a-'+tag+'>')
-                    # deselect object
-                    obj.location = location
-                    obj.select_set(state=False)
-                    exported_obj+=1
-
+                                    if asset_name not in exported_assets:
+                                        exported_assets.add(asset_name)
+                                        produced_assets.append(asset_name)
+                                        filename = os.path.join ( DEST_RES, PATH_ASSETS, asset_name ) # + '.glft' )
+                                        clear = 'CENTER'
+                                        if asset_name != obj.name:
+                                            # shared mesh: exported without the transform of its first instance
+                                            clear = 'TRANSFORM'
+                                        if compression_profile(scene, obj) != 'NONE':
+                                            draco_used = True
+                                        # simple static meshes are written by the fast writer, everything else by the glTF exporter
+                                        writer_reason = fast_writer_reason(scene, obj) if scene.b_fast_writer else "disabled"
+                                        fast = writer_reason is None
+                                        if scene.b_fast_writer:
+                                            report.append("[WRITER] "+asset_name+": "+("fast writer" if fast else "glTF exporter ("+writer_reason+")"))
+                                            writer_counts[fast] += 1
+                                        step = "fast_export" if fast else "gltf_export"
+                                        if scene.b_incremental_export and Watcher.scope is not None and obj.name not in Watcher.scope and obj not in batches and asset_name in manifest:
+                                            # watch mode: objects not changed since the last export keep their hash. The batches are rebuilt
+                                            # from their members by every export and are always hashed again
+                                            digest = manifest[asset_name]["hash"]
+                                        else:
+                                            digest = object_hash(obj, scene, image_digests, clear) if scene.b_incremental_export or asset_cache else None
+                                        lod_levels = []
+                                        ratios = lod_ratios(scene, obj) if obj.type == 'MESH' and gltf_model else []
+                                        # only this object is selected and moved, and only for a serial export (not for the cache hits),
+                                        # its transform and modifiers are restored even when the export fails
+                                        moved = None
+                                        modifier = None
+                                        try:
+                                            if scene.b_incremental_export and is_cached(manifest, asset_name, digest, assets_dir):
+                                                print("[INCREMENTAL] Unchanged, skip export of "+asset_name)
+                                                cache_hits += 1
+                                                new_manifest[asset_name] = manifest[asset_name]
+                                            else:
+                                                # shared asset cache: the same asset already exported by another project
+                                                files = restore_asset(asset_cache, digest, asset_name, assets_dir) if asset_cache else None
+                                                if files is not None:
+                                                    shared_hits += 1
+                                                elif scene.b_parallel_export and not fast:
+                                                    parallel_jobs.append([ obj.name, filename, clear, 1.0 ])
+                                                else:
+                                                    obj.select_set(state=True)
+                                                    moved = set_export_transform(obj, clear)
+                                                    started = time.perf_counter()
+                                                    export_model(filename, scene, obj, fast)
+                                                    profile.add(obj.name, step, started)
+                                                if files is None:
+                                                    written_assets.append(filename)
+                                                    if asset_cache:
+                                                        cache_stores.append(( digest, asset_name ))
+                                                if scene.b_incremental_export:
+                                                    cache_misses += 1
+                                                    # written files are listed once the export is done
+                                                    new_manifest[asset_name] = { "hash": digest, "files": files }
+                                            # LOD variants, exported with the same cleared transform. The triangle counts of the report are
+                                            # computed for the exported models only and kept in the manifest for the unchanged ones
+                                            triangles = []
+                                            if ratios:
+                                                entry = new_manifest.get(asset_name, {})
+                                                if "triangles" not in entry:
+                                                    entry["triangles"] = triangle_count(obj)
+                                                triangles.append(entry["triangles"])
+                                            for level, ratio in enumerate(ratios, 1):
+                                                lod_name = asset_name + LOD_SUFFIX + str(level)
+                                                lod_filename = os.path.join ( DEST_RES, PATH_ASSETS, lod_name )
+                                                produced_assets.append(lod_name)
+                                                lod_levels.append("./assets/"+lod_name+asset_extension(scene))
+                                                lod_digest = hashlib.sha256((digest+":"+str(ratio)).encode()).hexdigest() if digest else None
+                                                if scene.b_incremental_export and is_cached(manifest, lod_name, lod_digest, assets_dir):
+                                                    # no decimate modifier, no evaluation
+                                                    cache_hits += 1
+                                                    new_manifest[lod_name] = manifest[lod_name]
+                                                    triangles.append(manifest[lod_name].get("triangles", "?"))
+                                                    continue
+                                                modifier = add_lod_modifier(obj, ratio)
+                                                count = triangle_count(obj)
+                                                triangles.append(count)
+                                                files = restore_asset(asset_cache, lod_digest, lod_name, assets_dir) if asset_cache else None
+                                                if files is not None:
+                                                    shared_hits += 1
+                                                elif scene.b_parallel_export and not fast:
+                                                    parallel_jobs.append([ obj.name, lod_filename, clear, ratio ])
+                                                else:
+                                                    if moved is None:
+                                                        obj.select_set(state=True)
+                                                        moved = set_export_transform(obj, clear)
+                                                    started = time.perf_counter()
+                                                    export_model(lod_filename, scene, obj, fast)
+                                                    profile.add(obj.name, "lod_export", started)
+                                                if files is None:
+                                                    written_assets.append(lod_filename)
+                                                    if asset_cache:
+                                                        cache_stores.append(( lod_digest, lod_name ))
+                                                if scene.b_incremental_export:
+                                                    cache_misses += 1
+                                                    new_manifest[lod_name] = { "hash": lod_digest, "files": files, "triangles": count }
+                                                obj.modifiers.remove(modifier)
+                                                modifier = None
+                                        finally:
+                                            if modifier is not None:
+                                                obj.modifiers.remove(modifier)
+                                            if moved is not None:
+                                                restore_transform(obj, moved)
+                                                obj.select_set(state=False)
+                                        if ratios:
+                                            report.append("[LOD] "+asset_name+": "+" / ".join(str(count) for count in triangles)+" triangles")
+                                        asset_lods[asset_name] = lod_attribute(scene, lod_levels)
+                                        if not scene.b_streaming:
+                                            assets.append(SceneNode('asset', "a-asset-item", ( ("id", asset_name), ("src", "./assets/"+asset_name+asset_extension(scene)) ), 4))
+                                    if scene.b_streaming and gltf_model:
+                                        # the streaming loader sets gltf-model when the cell of the entity is near the player
+                                        add_to_cell(cells, cell_size, cell_position, "#"+obj.name, "./assets/"+asset_name+asset_extension(scene))
+                                        gltf_model = ()
+                                    if scene.b_cast_shadows:
+                                        entities.append(SceneNode('entity', "a-"+tag, ( ("id", "#"+obj.name), ) + gltf_model + actualtransform + ( ("visible", "true"), ("shadow", "cast: true") ) + reflections + animation + link + custom + toggle + classes + asset_lods.get(asset_name, ())))
+                                    else:
+                                        entities.append(SceneNode('entity', "a-"+tag, ( ("id", "#"+obj.name), ) + gltf_model + baked + actualtransform + ( ("visible", "true"), ("shadow", "cast: false") ) + reflections + animation + link + custom + toggle + classes + asset_lods.get(asset_name, ())))
+                            exported_obj+=1
+
+                    if image_swaps:
+                        profile.phase("images")
+                        swap_assets, swap_entities, swap_files = image_swap_nodes(os.path.join ( DEST_RES, PATH_MEDIA ), image_swaps, scene, report)
+                        assets.extend(swap_assets)
+                        entities.extend(swap_entities)
+
+                    if scene.b_fast_writer:
+                        report.append("[WRITER] "+str(writer_counts[True])+" assets written by the fast writer, "+str(writer_counts[False])+" by the glTF exporter")
+
+                    if scene.b_streaming:
+                        write_cells(os.path.join ( DEST_RES, PATH_CELLS ), cells, cell_size)
+                        entities.append(SceneNode('entity', "a-entity", ( ("id", "streaming"), ("streaming-loader", "src: ./"+PATH_CELLS+"; radius: "+str(scene.f_load_radius)) )))
+                        largest = max([ len(cell["assets"]) for cell in cells.values() ] or [ 0 ])
+                        report.append("[STREAMING] "+str(len(cells))+" cells of "+str(cell_size)+" m, up to "+str(largest)+" assets per cell")
+
+                    # glTF files of the whole loop exported by background workers
+                    if parallel_jobs:
+                        profile.phase("parallel_export")
+                        print("[PARALLEL] exporting "+str(len(parallel_jobs))+" objects with "+str(scene.i_export_workers)+" workers")
+                        export_gltf_parallel(parallel_jobs, scene, scene.i_export_workers)
+                finally:
+                    remove_batches(batches)
+        finally:
+            for obj in selection:
+                obj.select_set(state=True)
+
+        profile.phase("compression_report")
+        # Mesh compression report: geometry size before and after compression for each written asset
+        if draco_used:
+            total_raw = 0
+            total_stored = 0
+            for filename in written_assets:
+                raw, stored = geometry_sizes(filename + asset_extension(scene))
+                total_raw += raw
+                total_stored += stored
+                report.append("[COMPRESSION] "+os.path.basename(filename)+": "+str(raw)+" -> "+str(stored)+" geometry bytes")
+            report.append("[COMPRESSION] total: "+str(total_raw)+" -> "+str(total_stored)+" geometry bytes")
+
+        profile.phase("textures")
+        # Shared texture store: every texture written once under assets/textures/, named by its hash
+        if scene.b_texture_store:
+            textures_dir = os.path.join ( DEST_RES, PATH_ASSETS, PATH_TEXTURES )
+            os.makedirs ( textures_dir, exist_ok=True )
+            texture_stats = new_texture_stats(textures_dir)
+            for filename in written_assets:
+                store_textures(filename + asset_extension(scene), textures_dir, texture_stats, texture_settings(scene), scene)
+            texture_saved = finish_texture_store(textures_dir, texture_stats, report)
+
+        profile.phase("lights")
         # Loop the Lamps
         print('[LAMPS] Searching for lamps in scene')
         lamp_types = ['LIGHT']
@@ -761,23 +3025,60 @@ class AframeExport_OT_Operator(bpy.types.Operator):
                     cast_shadows = "true"
                 else:                     
                     cast_shadows = "false"
-                blender_lights.append('\n\t\t\t<a-entity position="'+light_position+'" light="castShadow:'+str(cast_shadows)+'; color:'+hex_color+'; distance:'+cutoff_distance+'; type:'+light_type+'; intensity:'+intensity+'; shadowBias: -0.001; shadowCameraFar: 501.02; shadowCameraBottom: 12; shadowCameraFov: 101.79; shadowCameraNear: 0; shadowCameraTop: -5; shadowCameraRight: 10; shadowCameraLeft: -10; shadowRadius: 2;"></a-entity>')
+                blender_lights.append(SceneNode('light', "a-entity", ( ("position", light_position), ("light", "castShadow:"+str(cast_shadows)+"; color:"+hex_color+"; distance:"+cutoff_distance+"; type:"+light_type+"; intensity:"+intensity+"; shadowBias: -0.001; shadowCameraFar: 501.02; shadowCameraBottom: 12; shadowCameraFov: 101.79; shadowCameraNear: 0; shadowCameraTop: -5; shadowCameraRight: 10; shadowCameraLeft: -10; shadowRadius: 2;") )))
         #print(blender_lights)
         # Loop the Lamps
 
-        print("[AFRAME EXPORTER] Completed Exporting Project.....................................")
+        profile.phase("manifest")
+        if scene.b_incremental_export and not scene.b_export_single_model:
+            for asset_name, entry in new_manifest.items():
+                if entry["files"] is None:
+                    entry["files"] = asset_files(scene, assets_dir, asset_name + asset_extension(scene))
+            save_manifest(manifest_path, new_manifest)
+            report.append("[INCREMENTAL] cache hits: "+str(cache_hits)+", misses: "+str(cache_misses))
+
+        if asset_cache:
+            stored = 0
+            for digest, asset_name in cache_stores:
+                if os.path.exists(os.path.join(assets_dir, asset_name + asset_extension(scene))):
+                    stored += store_asset(asset_cache, digest, asset_name, assets_dir, asset_files(scene, assets_dir, asset_name + asset_extension(scene)))
+            report.append("[ASSET CACHE] "+str(shared_hits)+" assets restored, "+str(stored)+" stored in "+asset_cache)
+
+        profile.phase("sync")
+        # every file written by this export, the files of the previous export not listed anymore are removed
+        outputs = [ PATH_INDEX, PATH_PROFILE ]
+        for asset_name in produced_assets:
+            entry = new_manifest.get(asset_name)
+            if entry and entry["files"] is not None:
+                files = entry["files"]
+            elif os.path.exists(os.path.join(assets_dir, asset_name + asset_extension(scene))):
+                files = asset_files(scene, assets_dir, asset_name + asset_extension(scene))
+            else:
+                files = []
+            outputs += [ PATH_ASSETS + f for f in files ]
+        if scene.b_incremental_export and not scene.b_export_single_model:
+            outputs.append(PATH_ASSETS + PATH_MANIFEST)
+        if scene.b_texture_store:
+            outputs.append(PATH_ASSETS + PATH_TEXTURES + PATH_TEXTURE_CACHE)
+        if scene.b_streaming and not scene.b_export_single_model:
+            outputs.append(PATH_CELLS)
+        outputs += [ PATH_LIGHTMAPS + file for file, offset, repeat in lightmap_atlases.values() ]
+        outputs += [ PATH_MEDIA + file for file in swap_files ]
+        sync_manifest_path = os.path.join ( DEST_RES, PATH_SYNC_MANIFEST )
+        prune_outputs(DEST_RES, outputs, load_sync_manifest(sync_manifest_path), sync_stats)
+        save_sync_manifest(sync_manifest_path, set(outputs))
+        sync_report(sync_stats, report)
 
-        bpy.ops.object.select_all(action='DESELECT')
+        print("[AFRAME EXPORTER] Completed Exporting Project.....................................")
 
         # Templating ------------------------------
-        #print(assets)
-        all_assets = ""
-        for x in assets:
-            all_assets += x
+        profile.phase("template")
+        # watch mode: the page reloads itself after every export
+        if Watcher.active:
+            entities.append(SceneNode('entity', "a-entity", ( ("id", "live-reload"), ("live-reload", "src: "+RELOAD_PATH) )))
 
-        all_entities = ""
-        for y in entities:
-            all_entities += y
+        # assets, entities and blender lights are streamed to the index file by write_index
+        streams = { "asset": assets, "entity": entities }
 
         # scene
         if scene.b_stats:
@@ -828,19 +3129,20 @@ class AframeExport_OT_Operator(bpy.types.Operator):
             final_lights = '<a-entity light="intensity: '+ light_directional_intensity+'; castShadow: '+showcast_shadows+'; shadowBias: -0.001; shadowCameraFar: 501.02; shadowCameraBottom: 12; shadowCameraFov: 101.79; shadowCameraNear: 0; shadowCameraTop: -5; shadowCameraRight: 10; shadowCameraLeft: -10; shadowRadius: 2" position="1.36586 7.17965 1"></a-entity>\n\t\t\t<a-entity light="type: ambient; intensity: '+light_ambient_intensity+'"></a-entity>'
             #print("final lights="+final_lights)
         else:
-            templights = ""
-            for x in blender_lights:
-                templights += x           
-            final_lights = templights
+            final_lights = None
+            streams["lights"] = blender_lights
+
+        # Draco decoder for the compressed glTF models
+        if draco_used:
+            draco_decoder = 'gltf-model="dracoDecoderPath: '+scene.s_draco_decoder_path+';"'
+        else:
+            draco_decoder = ""
 
         #Renderer
         showrenderer = 'renderer="antialias: '+str(scene.b_aa).lower()+'; colorManagement: '+str(scene.b_colorManagement).lower()+'; physicallyCorrectLights: '+str(scene.b_physicallyCorrectLights).lower()+';"'
 
         default_template()
-        t = Template( bpy.data.texts['index.html'].as_string() )
-        s = t.substitute(
-            asset=all_assets,
-            entity=all_entities,
+        values = dict(
             stats=showstats,
             aframe_version=scene.s_aframe_version,
             joystick=showjoystick,
@@ -851,17 +3153,43 @@ class AframeExport_OT_Operator(bpy.types.Operator):
             show_raycast=raycaster,
             sky=show_env_sky,
             render_shadows=template_render_shadows,
-            lights=final_lights,
-            renderer=showrenderer)
-
-
-        #print(s)
+            renderer=showrenderer,
+            draco_decoder=draco_decoder)
+        if final_lights is not None:
+            values["lights"] = final_lights
 
         # Saving the main INDEX FILE
-        with open( os.path.join ( DEST_RES, PATH_INDEX ), "w") as file:
-            file.write(s)
+        profile.phase("write")
+        template = bpy.data.texts['index.html'].as_string()
+        if draco_decoder and "${draco_decoder}" not in template:
+            # index.html text of a project made before the compression profiles: the decoder goes on the a-scene tag
+            if "<a-scene" in template:
+                template = template.replace("<a-scene", "<a-scene ${draco_decoder}", 1)
+                report.append("[TEMPLATE] index.html has no ${draco_decoder}, Draco decoder added to <a-scene>")
+            else:
+                report.append("[TEMPLATE] WARNING: index.html has no ${draco_decoder} and no <a-scene>, the compressed models will not load")
+        fragments, reused = write_index(os.path.join ( DEST_RES, PATH_INDEX ), template, values, streams)
+        report.append("[SCENE IR] "+str(len(assets)+len(entities)+len(blender_lights))+" nodes, "+str(fragments)+" fragments, "+str(reused)+" reused from the previous export")
+
+        # gzip copies of the text files, served with Content-Encoding
+        if scene.b_precompress:
+            profile.phase("precompress")
+            precompress(DEST_RES, report)
 
         scene.s_output = str(exported_obj)+" meshes exported"
+        if scene.b_incremental_export and not scene.b_export_single_model:
+            scene.s_output += " (cache: "+str(cache_hits)+" hits, "+str(cache_misses)+" misses)"
+        if scene.b_texture_store:
+            scene.s_output += ", "+str(texture_saved // 1024)+" KB saved on textures"
+        if asset_cache:
+            scene.s_output += ", "+str(shared_hits)+" from the asset cache"
+        # timing report, compared between releases
+        profile.write(os.path.join ( DEST_RES, PATH_PROFILE ), [ f + asset_extension(scene) for f in written_assets ] + [ os.path.join ( DEST_RES, PATH_INDEX ) ])
+        scene.s_output += " in "+profile.summary()
+        report.append("[PROFILE] "+profile.summary()+", details in "+PATH_PROFILE)
+        write_report(report)
+        if Server.instance:
+            Server.instance.notify_reload()
         #self.report({'INFO'}, str(exported_obj)+" meshes exported")
         return {'FINISHED'}
 
@@ -886,6 +3214,55 @@ _props = [
     ("float", "f_raycast_interval", "Raycast Interval","Raycast Interval to interact with objects", 1500.0 ),
     ("str", "export_path", "Export To","Path to the folder containing the files to import", "C:/Temp/", 'FILE_PATH'),
     ("bool", "b_export_single_model", "Export to a single glTF model","Export to a single glTF model" ),
+    ("enum", "s_export_format", "Format","Output format of the exported glTF models", [
+        ('GLTF_EMBEDDED', "glTF Embedded (.gltf)", "One .gltf file with buffers and textures embedded as base64"),
+        ('GLB', "glTF Binary (.glb)", "One binary .glb file: smaller and faster to parse"),
+        ('GLTF_SEPARATE', "glTF Separate (.gltf + .bin + textures)", "A .gltf file with an external .bin buffer and textures in the shared assets/textures/ folder") ], 'GLTF_EMBEDDED' ),
+    ("enum", "s_compression", "Compression","Mesh compression profile (AFRAME_COMPRESSION custom property overrides it per object)", [
+        ('NONE', "None", "No mesh compression"),
+        ('DRACO_FAST', "Draco Fast", "Draco level 1: fast decoding, larger files"),
+        ('DRACO', "Draco", "Draco level 6"),
+        ('DRACO_MAX', "Draco Max", "Draco level 10 with lower quantization: smallest files, slower decoding"),
+        ('QUANTIZE', "Quantize", "Draco level 0 with low quantization bits: quantized data with the fastest decoding") ], 'NONE' ),
+    ("str", "s_draco_decoder_path", "Draco Decoder","Url of the Draco decoder used by compressed models", "https://www.gstatic.com/draco/versioned/decoders/1.5.6/" ),
+    ("bool", "b_texture_store", "Shared Texture Store","Write every texture once in assets/textures/, named by its content hash, and reference it from all the glTF models" ),
+    ("enum", "s_texture_profile", "Texture Size","Maximum texture resolution of the stored textures", [
+        ('ORIGINAL', "Original", "Keep the original resolution"),
+        ('DESKTOP', "Desktop (4096)", "Longest side up to 4096 pixels"),
+        ('MOBILE', "Mobile (2048)", "Longest side up to 2048 pixels"),
+        ('STANDALONE', "Standalone Headset (1024)", "Longest side up to 1024 pixels") ], 'ORIGINAL' ),
+    ("bool", "b_texture_pot", "Power of Two Textures","Resize the stored textures to power of two sizes (mipmapping)" ),
+    ("enum", "s_texture_format", "Texture Format","File format of the stored textures", [
+        ('KEEP', "Keep", "Keep the exported format (PNG or JPEG)"),
+        ('PNG', "PNG", "Lossless PNG"),
+        ('JPEG', "JPEG", "Lossy JPEG (textures with alpha are kept as PNG)"),
+        ('WEBP', "WebP", "Lossy WebP") ], 'KEEP' ),
+    ("int", "i_texture_quality", "Texture Quality","JPEG/WebP quality of the stored textures", 85, 1, 100 ),
+    ("bool", "b_lod", "LOD","Export decimated variants of every mesh and switch them by camera distance (AFRAME_LOD custom property overrides the ratios per object)" ),
+    ("str", "s_lod_ratios", "LOD Ratios","Comma separated decimate ratio of each LOD level", "0.5, 0.2" ),
+    ("str", "s_lod_distances", "LOD Distances","Comma separated camera distance (meters) where each LOD level starts", "10, 25" ),
+    ("bool", "b_streaming", "Streaming","Group the glTF models in cells (cells.json) loaded and unloaded by the page as the player moves" ),
+    ("float", "f_cell_size", "Cell Size","Size (meters) of the streaming cells", 20.0 ),
+    ("float", "f_load_radius", "Load Radius","Distance (meters) from the player within which the cells are loaded", 30.0 ),
+    ("bool", "b_lazy_video", "Lazy Videos","Keep the videos that do not autoplay (AFRAME_VIDEO_AUTOPLAY false) out of a-assets, they are loaded on click or when the camera is near" ),
+    ("float", "f_video_distance", "Video Distance","Camera distance (meters) that loads a lazy video (0: only on click)", 5.0 ),
+    ("enum", "s_image_profile", "Swap Image Size","Maximum resolution of the AFRAME_IMAGES images (resized copies in media/swap/)", [
+        ('ORIGINAL', "Original", "Keep the original resolution"),
+        ('DESKTOP', "Desktop (4096)", "Longest side up to 4096 pixels"),
+        ('MOBILE', "Mobile (2048)", "Longest side up to 2048 pixels"),
+        ('STANDALONE', "Standalone Headset (1024)", "Longest side up to 1024 pixels") ], 'MOBILE' ),
+    ("bool", "b_image_atlas", "Swap Image Atlas","Pack the AFRAME_IMAGES sets of up to "+str(SWAP_ATLAS_MAX)+" images in one atlas texture, switched by UV offset" ),
+    ("bool", "b_static_batching", "Static Batching","Merge the non interactive meshes sharing the same materials to reduce the draw calls" ),
+    ("bool", "b_batch_by_cell", "Batch by Cell","Merge only the meshes in the same cell (Cell Size)" ),
+    ("bool", "b_precompress", "Precompress","Write a gzip copy (.gz) of the glTF, html, js, css and json files, served compressed by the preview servers" ),
+    ("bool", "b_incremental_export", "Incremental Export","Skip the glTF export of objects unchanged since the last export (hashes stored in assets/manifest.json)" ),
+    ("bool", "b_force_rebuild", "Force Full Rebuild","Ignore the incremental export manifest and export every object again" ),
+    ("str", "s_asset_cache", "Asset Cache","Folder shared between projects: glTF models already exported by another project (same object and settings) are copied instead of exported again", "", 'DIR_PATH'),
+    ("bool", "b_fast_writer", "Fast glTF Writer","Write the simple static meshes (no textures, armatures, shape keys, animations or compression) with the built-in NumPy writer instead of the glTF exporter" ),
+    ("bool", "b_parallel_export", "Parallel Export","Export the glTF models with background Blender processes" ),
+    ("int", "i_export_workers", "Workers","Number of background Blender processes used by the parallel export", min(os.cpu_count() or 1, 8), 1, 256 ),
+    ("str", "s_server_address", "Address", "Preview server bind address (empty: every network interface)", "" ),
+    ("int", "i_server_port", "Port", "Preview server port", PORT, 1, 65535 ),
     ("str", "s_project_name", "Name", "Project's name","aframe-prj"),
     ("str", "s_output", "output","output export","output"),
     ("bool", "b_use_lightmapper", "Use Lightmapper Add-on","Use Lightmapper for baking" ),
@@ -899,7 +3276,14 @@ _props = [
     ("bool", "b_export", "Exporter settings","b_export"),    
     ("bool", "b_bake", "Bake settings","b_bake"),         
     ("bool", "b_bake_lightmap", "Bake settings","b_bake_lightmap"),     
-    ("float", "f_lightMapIntensity", "LightMap Intensity","LightMap Intensity", 2.0),     
+    ("float", "f_lightMapIntensity", "LightMap Intensity","LightMap Intensity", 2.0),
+    ("enum", "s_lightmap_format", "Lightmap Format","File format of the saved lightmaps", [
+        ('PNG', "PNG", "Lossless PNG"),
+        ('JPEG', "JPEG", "Lossy JPEG"),
+        ('WEBP', "WebP", "Lossy WebP") ], 'PNG' ),
+    ("int", "i_lightmap_quality", "Lightmap Quality","JPEG/WebP quality of the saved lightmaps", 90, 1, 100 ),
+    ("bool", "b_lightmap_atlas", "Lightmap Atlas","Pack the lightmaps in a few atlas textures (lightmaps/atlas_<n>.png) at export" ),
+    ("int", "i_atlas_size", "Atlas Size","Size (pixels) of the lightmap atlases, bigger lightmaps are kept apart", 2048, 256, 16384 ),     
     ("str", "s_link", "Link Url", "Link Url" , "https://www.google.it/"),    
     ("str", "s_video", "Video File Name", "Video File Name" , "video.mp4"),        
     ("str", "s_showhide_object", "Show Hide Object", "Show Hide Object: insert object id \ne.g. Cube.001" , "Cube.001"),    
@@ -1021,6 +3405,12 @@ def _reg_str ( scene, prop, name, descr, default = "", subtype = "" ):
 def _reg_float ( scene, prop, name, descr, default = 0.0 ):
     setattr ( scene, prop, bpy.props.FloatProperty ( name = name, description = descr, default = default ) )
 
+def _reg_enum ( scene, prop, name, descr, items, default ):
+    setattr ( scene, prop, bpy.props.EnumProperty ( name = name, description = descr, items = items, default = default ) )
+
+def _reg_int ( scene, prop, name, descr, default = 0, min = 0, max = 2**31-1 ):
+    setattr ( scene, prop, bpy.props.IntProperty ( name = name, description = descr, default = default, min = min, max = max ) )
+
 def register():
     scn = bpy.types.Scene
 
@@ -1029,7 +3419,9 @@ def register():
     bpy.utils.register_class(AframeClean_OT_Operator)
     bpy.utils.register_class(AframeExport_OT_Operator)
     bpy.utils.register_class(AframeServe_OT_Operator)
+    bpy.utils.register_class(AframeWatch_OT_Operator)
     bpy.utils.register_class(AframeSavelm_OT_Operator)
+    bpy.utils.register_class(AframeLoadlm_OT_Operator)
     bpy.utils.register_class(AframeClear_OT_Operator)
     bpy.utils.register_class(AframePrepare_OT_Operator)
     bpy.utils.register_class(AframeClearAsset_OT_Operator)    
@@ -1046,6 +3438,8 @@ def register():
         if p [ 0 ] == 'str': _reg_str ( scn, * p [ 1 : ] )
         if p [ 0 ] == 'bool': _reg_bool ( scn, * p [ 1 : ] )
         if p [ 0 ] == 'float': _reg_float ( scn, * p [ 1 : ] )
+        if p [ 0 ] == 'int': _reg_int ( scn, * p [ 1 : ] )
+        if p [ 0 ] == 'enum': _reg_enum ( scn, * p [ 1 : ] )
 
     # deletes intex.html template embeded file
     #for t in bpy.data.texts:
@@ -1055,6 +3449,8 @@ def register():
 
 
 def unregister():
+    if Watcher.active:
+        stop_watch()
     if Server.instance:
         Server.instance.stop()
         Server.instance = None
@@ -1064,7 +3460,9 @@ def unregister():
     bpy.utils.unregister_class(AframeClean_OT_Operator)    
     bpy.utils.unregister_class(AframeExport_OT_Operator)
     bpy.utils.unregister_class(AframeServe_OT_Operator)
+    bpy.utils.unregister_class(AframeWatch_OT_Operator)
     bpy.utils.unregister_class(AframeSavelm_OT_Operator)
+    bpy.utils.unregister_class(AframeLoadlm_OT_Operator)
     bpy.utils.unregister_class(AframeClear_OT_Operator)
     bpy.utils.unregister_class(AframePrepare_OT_Operator)
     bpy.utils.unregister_class(AframeClearAsset_OT_Operator)    
@@ -0,0 +1,130 @@
+'''
+Command line batch export of many .blend files, run with any Python 3 (not inside Blender).
+
+python batch_export.py [--blender PATH] [--jobs N] [--set PROP=VALUE ...] [--asset-cache DIR]
+                       [--summary summary.json] [--timeout SECONDS] file.blend "projects/**/*.blend" ...
+
+Each file is exported by its own background Blender process ("blender -b file.blend"), up to --jobs
+(number of CPU cores by default) at the same time. --set overrides a scene property of the add-on
+(export_path, s_project_name, b_export_single_model, ...), "{name}" is replaced by the .blend file name:
+
+python batch_export.py --set export_path=/srv/www --set s_project_name={name} --asset-cache /srv/cache projects/*.blend
+
+With --asset-cache the glTF models are shared between the projects: an object already exported by another
+project with the same mesh, materials and settings is copied from the cache instead of exported again.
+The JSON summary (one entry per file: status, output, export report, time, error) is written to
+--summary or printed, the exit status is 1 when an export failed.
+'''
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ADDON_DIR = os.path.dirname(os.path.realpath(__file__))
+# Python code run by every background blender: sys.argv ends with [addon parent dir, addon module, job file]
+BATCH_EXPR = "import sys, importlib; sys.path.insert(0, sys.argv[-3]); importlib.import_module(sys.argv[-2]).run_batch_export(sys.argv[-1])"
+
+def blend_files(patterns):
+    # file names and glob patterns, each file once in the given order
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [ pattern ]
+        for path in matches:
+            path = os.path.abspath(path)
+            if path not in files:
+                files.append(path)
+    return files
+
+def parse_settings(values, parser):
+    settings = {}
+    for value in values:
+        name, sep, text = value.partition("=")
+        if not sep or not name:
+            parser.error("--set expects PROP=VALUE, got "+value)
+        settings[name.strip()] = text
+    return settings
+
+def export_file(path, blender, settings, timeout):
+    name = os.path.splitext(os.path.basename(path))[0]
+    result = { "file": path, "status": "error", "output": "", "report": [], "error": "" }
+    if not os.path.isfile(path):
+        result["error"] = "file not found"
+        return result
+    work = tempfile.mkdtemp(prefix="aframe_batch_")
+    job_path = os.path.join(work, "job.json")
+    result_path = os.path.join(work, "result.json")
+    log_path = os.path.join(work, "blender.log")
+    job = { "file": path, "settings": { prop: value.replace("{name}", name) for prop, value in settings.items() }, "result": result_path }
+    with open(job_path, "w") as file:
+        json.dump(job, file)
+    cmd = [ blender, "-b", path, "--factory-startup", "--python-exit-code", "1", "--python-expr", BATCH_EXPR,
+        "--", os.path.dirname(ADDON_DIR), os.path.basename(ADDON_DIR), job_path ]
+    started = time.perf_counter()
+    try:
+        with open(log_path, "wb") as log:
+            returncode = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, timeout=timeout).returncode
+        if os.path.exists(result_path):
+            with open(result_path, "r") as file:
+                result = json.load(file)
+        if returncode != 0 and result["status"] == "ok":
+            result["status"] = "error"
+        if result["status"] != "ok":
+            result["error"] = result["error"] or "blender exit status "+str(returncode)
+            with open(log_path, "rb") as log:
+                result["log"] = log.read()[-2000:].decode(errors="replace")
+    except subprocess.TimeoutExpired:
+        result["error"] = "timeout after "+str(timeout)+" s"
+    except OSError as e:
+        result["error"] = "cannot run blender: "+str(e)
+    finally:
+        for f in ( job_path, result_path, log_path ):
+            if os.path.exists(f):
+                os.remove(f)
+        os.rmdir(work)
+    result["wall_time"] = round(time.perf_counter() - started, 3)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="A-Frame exporter batch export")
+    parser.add_argument("files", nargs="+", help=".blend files or glob patterns")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="blender processes at the same time")
+    parser.add_argument("--set", action="append", default=[], metavar="PROP=VALUE", help="scene property override, {name} is the .blend file name")
+    parser.add_argument("--asset-cache", help="folder of the glTF models shared between the projects")
+    parser.add_argument("--summary", help="JSON summary file")
+    parser.add_argument("--timeout", type=float, help="maximum export time of one file, in seconds")
+    args = parser.parse_args()
+
+    files = blend_files(args.files)
+    if not files:
+        parser.error("no .blend file found")
+    settings = parse_settings(args.set, parser)
+    if args.asset_cache:
+        os.makedirs(args.asset_cache, exist_ok=True)
+        settings["s_asset_cache"] = os.path.abspath(args.asset_cache)
+
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, len(files)))) as pool:
+        for result in pool.map(lambda path: export_file(path, args.blender, settings, args.timeout), files):
+            print("[BATCH] "+result["status"]+" "+result["file"]+": "+(result["output"] if result["status"] == "ok" else result["error"]), flush=True)
+            results.append(result)
+
+    failed = [ result["file"] for result in results if result["status"] != "ok" ]
+    summary = { "files": len(results), "failed": len(failed), "wall_time": round(time.perf_counter() - started, 3), "results": results }
+    if args.summary:
+        with open(args.summary, "w") as file:
+            json.dump(summary, file, indent=1)
+    else:
+        print(json.dumps(summary, indent=1))
+    print("[BATCH] "+str(len(results) - len(failed))+"/"+str(len(results))+" files exported")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+'''
+Benchmark export, run inside Blender by run_benchmarks.py:
+
+blender -b [file.blend] --factory-startup --python benchmarks/blender_export.py -- --addon <addon dir> --out <dir> [--objects N] [--options JSON] [--check-fast-writer] --result <json>
+
+With --objects N the scene is replaced by a synthetic one: linked duplicates, lightmapped meshes,
+videos, images, lights and unique meshes on a grid.
+
+With --check-fast-writer (Fast glTF Writer enabled, GLB or embedded glTF format) every model written by the fast glTF writer is read back with load_gltf, its
+buffer views, accessors and indices are validated, and its triangles (position, normal, uv) and node
+transform are compared to the glTF exporter output of the same object. Mismatches fail the run.
+'''
+
+import os
+import sys
+import json
+import zlib
+import struct
+import shutil
+import argparse
+import importlib
+import tempfile
+import bpy
+import bmesh
+import numpy
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--addon", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--objects", type=int, default=0)
+    parser.add_argument("--options", default="{}")
+    parser.add_argument("--check-fast-writer", action="store_true")
+    parser.add_argument("--result", required=True)
+    return parser.parse_args(argv)
+
+def load_addon(addon_dir):
+    addon_dir = os.path.realpath(addon_dir)
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    addon = importlib.import_module(os.path.basename(addon_dir))
+    addon.register()
+    return addon
+
+def png(width, height, rgb):
+    # minimal RGB png, used as fake lightmap
+    row = b"\x00" + bytes(rgb) * width
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) + chunk(b"IDAT", zlib.compress(row * height)) + chunk(b"IEND", b"")
+
+def new_mesh(name, kind):
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    if kind == "sphere":
+        bmesh.ops.create_uvsphere(bm, u_segments=16, v_segments=8, radius=0.5)
+    elif kind == "plane":
+        bmesh.ops.create_grid(bm, x_segments=1, y_segments=1, size=0.5)
+    else:
+        bmesh.ops.create_cube(bm, size=1.0)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.uv_layers.new(name="UVMap")
+    return mesh
+
+def build_scene(count, lightmaps_dir):
+    # replace the scene with count objects on a grid, 10 objects pattern
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    materials = []
+    for i in range(4):
+        material = bpy.data.materials.new("bench_material_"+str(i))
+        material.diffuse_color = (0.2 * i, 0.5, 1.0 - 0.2 * i, 1.0)
+        materials.append(material)
+    shared = new_mesh("bench_shared", "cube")
+    shared.materials.append(materials[0])
+    os.makedirs(lightmaps_dir, exist_ok=True)
+    side = max(1, int(count ** 0.5))
+    for i in range(count):
+        kind = i % 10
+        name = "bench_"+str(i)
+        if kind == 8:
+            obj = bpy.data.objects.new(name, bpy.data.lights.new(name, 'POINT'))
+        elif kind < 4:
+            # linked duplicates
+            obj = bpy.data.objects.new(name, shared)
+        else:
+            mesh = new_mesh(name, "plane" if kind in (6, 7) else "sphere")
+            mesh.materials.append(materials[i % len(materials)])
+            obj = bpy.data.objects.new(name, mesh)
+            if kind in (4, 5):
+                with open(os.path.join(lightmaps_dir, name+"_baked.png"), "wb") as file:
+                    file.write(png(8, 8, (128, 128, 128)))
+            elif kind == 6:
+                obj["AFRAME_VIDEO"] = "video.mp4"
+            elif kind == 7:
+                obj["AFRAME_IMAGES"] = '{"1": "image1.png", "2": "image2.png"}'
+        obj.location = ( (i % side) * 3.0, (i // side) * 3.0, 0.0 )
+        scene.collection.objects.link(obj)
+    return scene
+
+_DTYPES = { 5121: numpy.uint8, 5123: numpy.uint16, 5125: numpy.uint32, 5126: numpy.float32 }
+_WIDTHS = { "SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4 }
+
+def read_accessor(data, binary, index):
+    # accessor rows, after checking that they are inside their buffer view and the view inside the buffer
+    accessor = data["accessors"][index]
+    view = data["bufferViews"][accessor["bufferView"]]
+    dtype = numpy.dtype(_DTYPES[accessor["componentType"]])
+    width = _WIDTHS[accessor["type"]]
+    stride = view.get("byteStride", dtype.itemsize * width)
+    start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    end = view.get("byteOffset", 0) + view["byteLength"]
+    count = accessor["count"]
+    assert start % dtype.itemsize == 0, "misaligned accessor "+str(index)
+    assert end <= len(binary), "buffer view outside the buffer"
+    assert count == 0 or start + stride * (count - 1) + dtype.itemsize * width <= end, "accessor "+str(index)+" outside its view"
+    rows = numpy.ndarray((count, width), dtype=dtype, buffer=binary, offset=start, strides=(stride, dtype.itemsize))
+    if "min" in accessor:
+        assert numpy.allclose(rows.min(axis=0), accessor["min"]) and numpy.allclose(rows.max(axis=0), accessor["max"]), "wrong min/max of accessor "+str(index)
+    return rows.astype(numpy.float64)
+
+def gltf_triangles(addon, path):
+    # triangles of the first mesh as sorted tuples of rounded (position, normal, uv) corners, each one starting at its smallest corner
+    data, binary = addon.load_gltf(path)
+    assert binary is not None and len(binary) >= data["buffers"][0]["byteLength"], "missing buffer"
+    triangles = []
+    for primitive in data["meshes"][0]["primitives"]:
+        attributes = primitive["attributes"]
+        columns = [ read_accessor(data, binary, attributes[key]) for key in ( "POSITION", "NORMAL", "TEXCOORD_0" ) if key in attributes ]
+        assert len(set(len(column) for column in columns)) == 1, "attributes of different lengths"
+        vertices = numpy.hstack(columns).round(3) + 0.0
+        indices = read_accessor(data, binary, primitive["indices"]).astype(numpy.int64).reshape(-1, 3)
+        assert indices.size == 0 or indices.max() < len(vertices), "index out of range"
+        for triangle in vertices[indices]:
+            corners = [ tuple(corner) for corner in triangle ]
+            first = corners.index(min(corners))
+            triangles.append(tuple(corners[first:] + corners[:first]))
+    node = data["nodes"][0]
+    transform = numpy.array(node.get("translation", [ 0, 0, 0 ]) + node.get("rotation", [ 0, 0, 0, 1 ]) + node.get("scale", [ 1, 1, 1 ]))
+    return sorted(triangles), transform
+
+def check_fast_writer(addon, scene, assets_dir):
+    # compare every fast writer model to the glTF exporter model of the same object
+    checked = []
+    errors = []
+    tmp_dir = tempfile.mkdtemp(prefix="aframe_check_")
+    addon.deselect_objects(bpy.context.view_layer)
+    for obj in bpy.data.objects:
+        path = os.path.join(assets_dir, obj.name + addon.asset_extension(scene))
+        if addon.fast_writer_reason(scene, obj) is not None or not os.path.exists(path):
+            continue
+        reference = os.path.join(tmp_dir, obj.name)
+        obj.select_set(state=True)
+        saved = addon.set_export_transform(obj, 'CENTER')
+        addon.export_gltf(reference, scene, obj)
+        addon.restore_transform(obj, saved)
+        obj.select_set(state=False)
+        try:
+            fast, fast_transform = gltf_triangles(addon, path)
+            gltf, gltf_transform = gltf_triangles(addon, reference + addon.asset_extension(scene))
+            if fast != gltf:
+                errors.append(obj.name+": "+str(len(fast))+" triangles, "+str(len(gltf))+" with the glTF exporter, "+str(len(set(fast) ^ set(gltf)))+" different")
+            elif not numpy.allclose(fast_transform, gltf_transform, atol=1e-4):
+                errors.append(obj.name+": node transform "+str(fast_transform.tolist())+" instead of "+str(gltf_transform.tolist()))
+        except (AssertionError, KeyError, ValueError) as e:
+            errors.append(obj.name+": "+str(e))
+        checked.append(obj.name)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return { "checked": len(checked), "errors": errors }
+
+def main():
+    args = parse_args()
+    project = "bench"
+    scene = bpy.context.scene
+    if args.objects:
+        # before the add-on registration: the factory settings reset would drop it
+        scene = build_scene(args.objects, os.path.join(args.out, project, "lightmaps"))
+    addon = load_addon(args.addon)
+    scene.export_path = args.out
+    scene.s_project_name = project
+    for prop, value in json.loads(args.options).items():
+        setattr(scene, prop, value)
+    if args.check_fast_writer:
+        scene.b_fast_writer = True
+    result = bpy.ops.aframe.export()
+    output = { "status": sorted(result), "objects": len(bpy.data.objects), "output": scene.s_output }
+    if args.check_fast_writer:
+        check = check_fast_writer(addon, scene, os.path.join(args.out, project, "assets"))
+        output["fast_writer_check"] = check
+        print("[CHECK] "+str(check["checked"])+" fast writer models checked, "+str(len(check["errors"]))+" errors")
+        for error in check["errors"]:
+            print("[CHECK] "+error)
+    with open(args.result, "w") as file:
+        json.dump(output, file)
+    if args.check_fast_writer and output["fast_writer_check"]["errors"]:
+        sys.exit(1)
+
+main()
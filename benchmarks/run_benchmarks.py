@@ -0,0 +1,161 @@
+'''
+Headless export benchmarks (Linux, CPU only).
+
+python benchmarks/run_benchmarks.py [--blender PATH] [--cases addon_test,synthetic_100] [--options JSON]
+                                    [--repeat N] [--tolerance 0.2] [--update-baseline] [--check-fast-writer]
+
+Each case exports a scene with "blender -b" (the add-on test file, or synthetic scenes of 10 to 10000
+objects) and records wall time, peak RSS, output bytes and file count. Results are compared to
+benchmarks/baseline.json: the exit status is 1 when a case fails or a metric is above the baseline
+by more than the tolerance (and, with --require-baseline, when a case has no baseline).
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+ADDON_DIR = os.path.dirname(BENCH_DIR)
+PATH_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+PATH_RESULTS = os.path.join(BENCH_DIR, "results.json")
+METRICS = ( "wall_time", "peak_rss_kb", "output_bytes", "file_count" )
+
+# case name -> (blend file, synthetic object count)
+CASES = {
+    "addon_test": ( os.path.join(ADDON_DIR, "aframe_exporter_addon_test.blend"), 0 ),
+    "synthetic_10": ( None, 10 ),
+    "synthetic_100": ( None, 100 ),
+    "synthetic_1000": ( None, 1000 ),
+    "synthetic_10000": ( None, 10000 ),
+}
+
+def output_stats(directory):
+    files = 0
+    size = 0
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return size, files
+
+def run_case(name, blender, options, check_fast_writer):
+    blend, objects = CASES[name]
+    out = tempfile.mkdtemp(prefix="aframe_bench_")
+    try:
+        result_path = os.path.join(out, "result.json")
+        cmd = [ blender, "-b" ] + ([ blend ] if blend else []) + [ "--factory-startup", "--python-exit-code", "1",
+            "--python", os.path.join(BENCH_DIR, "blender_export.py"), "--",
+            "--addon", ADDON_DIR, "--out", out, "--objects", str(objects), "--options", json.dumps(options), "--result", result_path ] + ([ "--check-fast-writer" ] if check_fast_writer else [])
+        log_path = os.path.join(out, "blender.log")
+        with open(log_path, "wb") as log:
+            started = time.perf_counter()
+            try:
+                process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+            except OSError as e:
+                return { "error": "cannot run blender: "+str(e) }
+            # wait4: resource usage of this blender process only
+            _, status, usage = os.wait4(process.pid, 0)
+            wall_time = time.perf_counter() - started
+        returncode = os.waitstatus_to_exitcode(status)
+        if returncode != 0 or not os.path.exists(result_path):
+            with open(log_path, "rb") as log:
+                return { "error": "blender exit status "+str(returncode), "log": log.read()[-2000:].decode(errors="replace") }
+        with open(result_path, "r") as file:
+            export = json.load(file)
+        if export["status"] != [ "FINISHED" ]:
+            # a cancelled export is not measured
+            return { "error": "export status "+", ".join(export["status"])+": "+export["output"] }
+        os.remove(result_path)
+        os.remove(log_path)
+        output_bytes, file_count = output_stats(out)
+        return {
+            "wall_time": round(wall_time, 3),
+            "peak_rss_kb": usage.ru_maxrss,
+            "output_bytes": output_bytes,
+            "file_count": file_count,
+            "objects": export["objects"],
+            "export": export["output"],
+            "fast_writer_check": export.get("fast_writer_check"),
+        }
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+def compare(results, baseline, tolerance, require_baseline):
+    # regressions: metric above baseline * (1 + tolerance), and the cases without baseline with require_baseline
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if "error" in result:
+            regressions.append(name+": "+result["error"])
+            continue
+        if base is None:
+            print("  WARNING "+name+": no baseline, not compared (run once with --update-baseline)")
+            if require_baseline:
+                regressions.append(name+": no baseline")
+            continue
+        for metric in METRICS:
+            if base.get(metric):
+                ratio = result[metric] / base[metric]
+                print("  %s %s: %s (baseline %s, x%.2f)" % (name, metric, result[metric], base[metric], ratio))
+                if ratio > 1.0 + tolerance:
+                    regressions.append("%s %s x%.2f" % (name, metric, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="A-Frame exporter benchmarks")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"))
+    parser.add_argument("--cases", default="addon_test,synthetic_10,synthetic_100,synthetic_1000,synthetic_10000")
+    parser.add_argument("--options", default="{}", help="scene properties set before the export, as JSON")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the fastest one is kept")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check-fast-writer", action="store_true", help="compare the fast writer models to the glTF exporter")
+    parser.add_argument("--require-baseline", action="store_true", help="cases without baseline fail")
+    args = parser.parse_args()
+    options = json.loads(args.options)
+
+    results = {}
+    for name in args.cases.split(","):
+        if name not in CASES:
+            parser.error("unknown case "+name)
+        runs = [ run_case(name, args.blender, options, args.check_fast_writer) for i in range(max(1, args.repeat)) ]
+        ok = [ run for run in runs if "error" not in run ]
+        results[name] = min(ok, key=lambda run: run["wall_time"]) if ok else runs[0]
+        print(name+": "+json.dumps(results[name]))
+
+    report = { "platform": platform.platform(), "python": platform.python_version(), "options": options, "cases": results }
+    with open(PATH_RESULTS, "w") as file:
+        json.dump(report, file, indent=1)
+
+    if args.update_baseline:
+        if any("error" in result for result in results.values()):
+            print("baseline not updated: some cases failed")
+            return 1
+        baseline = {}
+        if os.path.exists(PATH_BASELINE):
+            with open(PATH_BASELINE, "r") as file:
+                baseline = json.load(file)
+        baseline.setdefault("cases", {}).update(results)
+        baseline["platform"] = report["platform"]
+        with open(PATH_BASELINE, "w") as file:
+            json.dump(baseline, file, indent=1)
+        print("baseline updated: "+PATH_BASELINE)
+        return 0
+
+    baseline = {}
+    if os.path.exists(PATH_BASELINE):
+        with open(PATH_BASELINE, "r") as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance, args.require_baseline)
+    for regression in regressions:
+        print("REGRESSION "+regression)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import os
 import sys
 import time
 import threading
@@ -9,7 +10,25 @@ port = 3600
 url = f"http://{ip}:{port}"
 server_address = (ip, port)
 
-httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
+class GzipRequestHandler(SimpleHTTPRequestHandler):
+    # serve the precompressed file.gz written by the exporter when the browser accepts gzip
+    def send_head(self):
+        path = self.translate_path(self.path)
+        gz_path = path + ".gz"
+        if "gzip" not in self.headers.get("Accept-Encoding", "") or not os.path.isfile(path) or not os.path.isfile(gz_path):
+            return SimpleHTTPRequestHandler.send_head(self)
+        if os.path.getmtime(gz_path) < os.path.getmtime(path):
+            return SimpleHTTPRequestHandler.send_head(self)
+        file = open(gz_path, "rb")
+        self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(os.fstat(file.fileno()).st_size))
+        self.end_headers()
+        return file
+
+httpd = HTTPServer(server_address, GzipRequestHandler)
 
 def start_server():
     httpd.serve_forever()
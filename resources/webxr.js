@@ -50,28 +50,259 @@ AFRAME.registerComponent('link-handler', {
   }
 });
 
-// click to jump next images
+// click to jump next images: src cycles through the images (asset ids), or through the cells of an
+// atlas texture (columns x rows cells numbered from the top left corner)
 AFRAME.registerComponent('images-handler', {
-
+  schema: {
+    images: { type: 'array' },
+    count: { type: 'int', default: 0 },
+    columns: { type: 'int', default: 1 },
+    rows: { type: 'int', default: 1 }
+  },
   init: function () {
-    var data = this.data;
-    //alert(data.target);
-    //let images = this.data.array;
+    var self = this;
+    this.index = 0;
+    this.map = null;
+    this.el.addEventListener('materialtextureloaded', function () {
+      if (self.data.count > 0) {
+        self.cloneMap();
+        self.showCell();
+      }
+    });
     this.el.addEventListener('click', function () {
-      //this.setAttribute('color', data.color);        
-      //alert(data.action);
-      let value = this.getAttribute("src");
-      //alert(value);
-      if (value == "#image_1") {
-        this.setAttribute("src", "#image_2");
+      self.next();
+    });
+  },
+  next: function () {
+    var data = this.data;
+    var count = data.count > 0 ? data.count : data.images.length;
+    if (count < 2) {
+      return;
+    }
+    this.index = (this.index + 1) % count;
+    if (data.count > 0) {
+      this.showCell();
+    } else {
+      this.el.setAttribute('src', data.images[this.index]);
+    }
+  },
+  cloneMap: function () {
+    // the atlas texture is shared by the entities with the same images, each one needs its own offset
+    var mesh = this.el.getObject3D('mesh');
+    if (!mesh || !mesh.material.map) {
+      return;
+    }
+    this.map = mesh.material.map.clone();
+    this.map.needsUpdate = true;
+    this.map.repeat.set(1 / this.data.columns, 1 / this.data.rows);
+    mesh.material.map = this.map;
+    mesh.material.needsUpdate = true;
+  },
+  showCell: function () {
+    if (!this.map) {
+      return;
+    }
+    var column = this.index % this.data.columns;
+    var row = Math.floor(this.index / this.data.columns);
+    // texture coordinates start from the bottom
+    this.map.offset.set(column / this.data.columns, (this.data.rows - 1 - row) / this.data.rows);
+  }
+});
+
+
+// distance based level of detail: level 0 is the gltf-model of the entity,
+// the other levels are loaded the first time they are needed
+AFRAME.registerComponent('lod', {
+  schema: {
+    levels: { type: 'array' },
+    distances: { type: 'array' }
+  },
+  init: function () {
+    var self = this;
+    this.level = 0;
+    this.models = [];
+    this.position = new THREE.Vector3();
+    this.cameraPosition = new THREE.Vector3();
+    this.tick = AFRAME.utils.throttleTick(this.tick, 250, this);
+    this.el.addEventListener('model-loaded', function (e) {
+      // events of the level entities bubble up to this entity
+      if (e.target == self.el) {
+        self.show(self.level);
+      }
+    });
+  },
+  tick: function () {
+    var camera = this.el.sceneEl.camera;
+    if (!camera) {
+      return;
+    }
+    this.el.object3D.getWorldPosition(this.position);
+    camera.getWorldPosition(this.cameraPosition);
+    var distance = this.position.distanceTo(this.cameraPosition);
+    var level = 0;
+    while (level < this.data.levels.length && distance > parseFloat(this.data.distances[level])) {
+      level++;
+    }
+    if (level != this.level) {
+      this.setLevel(level);
+    }
+  },
+  setLevel: function (level) {
+    var self = this;
+    if (!this.el.hasAttribute('gltf-model')) {
+      // streamed entity in a cell not loaded yet (or unloaded): no level download
+      return;
+    }
+    this.level = level;
+    if (level > 0 && !this.models[level]) {
+      var model = document.createElement('a-entity');
+      model.setAttribute('gltf-model', 'url(' + this.data.levels[level - 1] + ')');
+      if (this.el.hasAttribute('shadow')) {
+        model.setAttribute('shadow', this.el.getAttribute('shadow'));
+      }
+      model.addEventListener('model-loaded', function () {
+        self.show(self.level);
+      });
+      this.el.appendChild(model);
+      this.models[level] = model;
+    }
+    this.show(level);
+  },
+  show: function (level) {
+    // keep the current mesh visible until the new level is loaded
+    var model = level > 0 ? this.models[level] : this.el;
+    if (!model || !model.getObject3D('mesh')) {
+      return;
+    }
+    var mesh = this.el.getObject3D('mesh');
+    if (mesh) {
+      mesh.visible = (level == 0);
+    }
+    for (var i = 1; i < this.models.length; i++) {
+      if (this.models[i] && this.models[i].getObject3D('mesh')) {
+        this.models[i].getObject3D('mesh').visible = (i == level);
+      }
+    }
+  },
+  reset: function () {
+    // drop the loaded levels (used when the streaming loader unloads the entity)
+    for (var i = 1; i < this.models.length; i++) {
+      if (this.models[i]) {
+        disposeModel(this.models[i]);
+        this.models[i].parentNode.removeChild(this.models[i]);
+      }
+    }
+    this.models = [];
+    this.level = 0;
+  }
+});
+
+// free the gpu memory of a glTF model before removing it
+function disposeModel(el) {
+  var mesh = el.getObject3D('mesh');
+  if (!mesh) {
+    return;
+  }
+  mesh.traverse(function (node) {
+    if (node.geometry) {
+      node.geometry.dispose();
+    }
+    if (node.material) {
+      [].concat(node.material).forEach(function (material) {
+        for (var key in material) {
+          if (material[key] && material[key].isTexture) {
+            material[key].dispose();
+          }
+        }
+        material.dispose();
+      });
+    }
+  });
+}
+
+// streaming export: loads the glTF models of the cells (cells.json) within radius of the player,
+// unloads them when the player is half a cell further away
+AFRAME.registerComponent('streaming-loader', {
+  schema: {
+    src: { default: './cells.json' },
+    radius: { type: 'number', default: 30 },
+    target: { default: '#player' }
+  },
+  init: function () {
+    var self = this;
+    this.cells = null;
+    this.loaded = {};
+    this.position = new THREE.Vector3();
+    this.tick = AFRAME.utils.throttleTick(this.tick, 500, this);
+    fetch(this.data.src).then(function (response) {
+      return response.json();
+    }).then(function (data) {
+      self.cells = data;
+    });
+  },
+  tick: function () {
+    var player = document.querySelector(this.data.target);
+    if (!this.cells || !player) {
+      return;
+    }
+    player.object3D.getWorldPosition(this.position);
+    var half = this.cells.cellSize / 2;
+    for (var id in this.cells.cells) {
+      var cell = this.cells.cells[id];
+      // distance from the player to the cell square
+      var dx = Math.max(Math.abs(this.position.x - cell.center[0]) - half, 0);
+      var dz = Math.max(Math.abs(this.position.z - cell.center[1]) - half, 0);
+      var distance = Math.sqrt(dx * dx + dz * dz);
+      if (!this.loaded[id] && distance <= this.data.radius) {
+        this.setCell(cell, true);
+        this.loaded[id] = true;
+      }
+      else if (this.loaded[id] && distance > this.data.radius + half) {
+        this.setCell(cell, false);
+        this.loaded[id] = false;
+      }
+    }
+  },
+  setCell: function (cell, load) {
+    cell.entities.forEach(function (entity) {
+      var el = document.getElementById(entity[0]);
+      if (!el) {
+        return;
+      }
+      if (load) {
+        el.setAttribute('gltf-model', 'url(' + entity[1] + ')');
+        if (el.components.lod) {
+          el.components.lod.play();
+        }
       }
       else {
-        this.setAttribute("src", "#image_1");
+        if (el.components.lod) {
+          // no lod tick while unloaded, it would download the far levels again
+          el.components.lod.pause();
+          el.components.lod.reset();
+        }
+        disposeModel(el);
+        el.removeAttribute('gltf-model');
       }
-    })
+    });
   }
 });
 
+// watch mode: reload the page when the Blender preview server signals a new export
+AFRAME.registerComponent('live-reload', {
+  schema: {
+    src: { default: '/__reload' }
+  },
+  init: function () {
+    this.source = new EventSource(this.data.src);
+    this.source.onmessage = function () {
+      window.location.reload();
+    };
+  },
+  remove: function () {
+    this.source.close();
+  }
+});
 
 // init function is called after onload event
 function init() {
@@ -86,17 +317,26 @@ function init() {
  * properties.
  * From: https://github.com/colinfizgig/aframe_Components/blob/master/components/light-map-geometry.js
  */
+// lightmap textures shared by every entity using the same file (atlas)
+var lightMapTextures = {};
+
 AFRAME.registerComponent('light-map-geometry', {
   schema: {
     path: { default: '' },
     format: { default: 'RGBFormat' },
-    intensity: { default: 1.0 }
+    intensity: { default: 1.0 },
+    // atlas placement of the lightmap, in uv units from the top left corner
+    offset: { type: 'vec2', default: { x: 0, y: 0 } },
+    repeat: { type: 'vec2', default: { x: 1, y: 1 } }
   },
 
   init: function () {
     const data = this.data;
     const el = this.el;
-    this.texture = new THREE.TextureLoader().load(data.path);
+    if (!lightMapTextures[data.path]) {
+      lightMapTextures[data.path] = new THREE.TextureLoader().load(data.path);
+    }
+    this.texture = lightMapTextures[data.path];
     this.intensity = data.intensity;
     this.applyLightMap();
     this.el.addEventListener('object3dset', this.applyLightMap.bind(this));
@@ -108,9 +348,20 @@ AFRAME.registerComponent('light-map-geometry', {
     this.texture.flipY = false;
     const el = this.el
     const value = this.intensity;
+    const offset = this.data.offset;
+    const repeat = this.data.repeat;
 
     if (!mesh) return;
     mesh.traverse(function (node) {
+      // atlas: move the lightmap uvs (uv2) into the lightmap area, once per geometry
+      const uv2 = node.geometry && node.geometry.attributes.uv2;
+      if (uv2 && !node.geometry.userData.lightMapAtlas && (repeat.x != 1 || repeat.y != 1 || offset.x != 0 || offset.y != 0)) {
+        for (let i = 0; i < uv2.count; i++) {
+          uv2.setXY(i, uv2.getX(i) * repeat.x + offset.x, uv2.getY(i) * repeat.y + offset.y);
+        }
+        uv2.needsUpdate = true;
+        node.geometry.userData.lightMapAtlas = true;
+      }
       //if (node.geometry && node.geometry.type == "BufferGeometry") {
       //console.log(node);
       //console.log(node.geometry.attributes);
@@ -123,4 +374,72 @@ AFRAME.registerComponent('light-map-geometry', {
       }
     });
   }
-});
\ No newline at end of file
+});
+
+// video kept out of a-assets: the video element is created on the first click or when the
+// camera comes within distance (0: click only), then every click toggles play / pause
+AFRAME.registerComponent('lazy-video', {
+  schema: {
+    src: { type: 'string' },
+    distance: { type: 'number', default: 5 },
+    autoplay: { type: 'boolean', default: false },
+    loop: { type: 'boolean', default: true }
+  },
+  init: function () {
+    var self = this;
+    this.video = null;
+    this.position = new THREE.Vector3();
+    this.cameraPosition = new THREE.Vector3();
+    this.tick = AFRAME.utils.throttleTick(this.tick, 500, this);
+    this.el.addEventListener('click', function () {
+      if (!self.video) {
+        self.attach(true, true);
+      } else if (self.video.paused) {
+        self.play(true);
+      } else {
+        self.video.pause();
+      }
+    });
+  },
+  tick: function () {
+    var camera = this.el.sceneEl.camera;
+    if (this.video || !this.data.distance || !camera) {
+      return;
+    }
+    this.el.object3D.getWorldPosition(this.position);
+    camera.getWorldPosition(this.cameraPosition);
+    if (this.position.distanceTo(this.cameraPosition) < this.data.distance) {
+      this.attach(this.data.autoplay, false);
+    }
+  },
+  attach: function (play, gesture) {
+    // the browser only downloads the parts it plays or seeks (range requests)
+    var video = document.createElement('video');
+    video.setAttribute('crossorigin', 'anonymous');
+    video.setAttribute('playsinline', '');
+    video.setAttribute('webkit-playsinline', '');
+    video.preload = play ? 'auto' : 'metadata';
+    video.loop = this.data.loop;
+    video.src = this.data.src;
+    this.video = video;
+    this.el.setAttribute('material', 'src', video);
+    if (play) {
+      this.play(gesture);
+    }
+  },
+  play: function (gesture) {
+    // without a user gesture the browsers only play muted videos
+    this.video.muted = !gesture;
+    var promise = this.video.play();
+    if (promise) {
+      promise.catch(function () {});
+    }
+  },
+  remove: function () {
+    if (this.video) {
+      this.video.pause();
+      this.video.removeAttribute('src');
+      this.video.load();
+    }
+  }
+});